@@ -1,8 +1,11 @@
 from django.contrib import admin
+from django.db import transaction
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
-from .models import Post, Comment, Category, Tag
+from .models import Post, Comment, Category, Tag, recount_comments
+from search.admin import SearchIndexAdminMixin
+from lib.page_cache import invalidate_pages
 
 
 @admin.register(Category)
@@ -28,8 +31,9 @@ class CategoryAdmin(admin.ModelAdmin):
     )
     
     def post_count(self, obj):
-        return obj.get_post_count()
+        return obj.published_post_count
     post_count.short_description = 'Published Posts'
+    post_count.admin_order_field = 'published_post_count'
     
     def color_display(self, obj):
         return format_html(
@@ -59,12 +63,13 @@ class TagAdmin(admin.ModelAdmin):
     )
     
     def post_count(self, obj):
-        return obj.get_post_count()
+        return obj.published_post_count
     post_count.short_description = 'Published Posts'
+    post_count.admin_order_field = 'published_post_count'
 
 
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(SearchIndexAdminMixin, admin.ModelAdmin):
     list_display = [
         'title', 'author', 'slug_display', 'status', 'featured', 'views_count', 
         'likes_count', 'comments_count', 'created_at', 'published_at'
@@ -73,7 +78,8 @@ class PostAdmin(admin.ModelAdmin):
         'status', 'featured', 'created_at', 'published_at', 
         'categories', 'tags', 'author'
     ]
-    search_fields = ['title', 'content', 'author__username', 'author__email']
+    # Post bodies are matched through the search index instead of LIKE '%...%' on content
+    search_fields = ['title', 'author__username', 'author__email']
     prepopulated_fields = {'slug': ('title',)}
     readonly_fields = [
         'uuid', 'views_count', 'likes_count', 'comments_count', 
@@ -122,13 +128,23 @@ class PostAdmin(admin.ModelAdmin):
     actions = ['make_published', 'make_draft', 'make_featured']
     
     def make_published(self, request, queryset):
-        queryset.update(status='published')
-        self.message_user(request, f'{queryset.count()} posts marked as published.')
+        # Saved one by one so the signal handlers keep category/tag counts,
+        # related posts and the search index in sync (update() would skip them)
+        posts = list(queryset.exclude(status='published'))
+        with transaction.atomic():
+            for post in posts:
+                post.status = 'published'
+                post.save()
+        self.message_user(request, f'{len(posts)} posts marked as published.')
     make_published.short_description = 'Mark selected posts as published'
     
     def make_draft(self, request, queryset):
-        queryset.update(status='draft')
-        self.message_user(request, f'{queryset.count()} posts marked as draft.')
+        posts = list(queryset.exclude(status='draft'))
+        with transaction.atomic():
+            for post in posts:
+                post.status = 'draft'
+                post.save()
+        self.message_user(request, f'{len(posts)} posts marked as draft.')
     make_draft.short_description = 'Mark selected posts as draft'
     
     def make_featured(self, request, queryset):
@@ -145,6 +161,8 @@ class CommentAdmin(admin.ModelAdmin):
     ]
     list_filter = ['active', 'flagged', 'created_at', 'post']
     search_fields = ['content', 'author__username', 'post__title']
+    # post_title and __str__ read both relations
+    list_select_related = ['post', 'author']
     readonly_fields = ['created_at', 'updated_at', 'likes_count']
     
     fieldsets = (
@@ -173,8 +191,12 @@ class CommentAdmin(admin.ModelAdmin):
     actions = ['approve_comments', 'flag_comments']
     
     def approve_comments(self, request, queryset):
-        queryset.update(active=True, flagged=False)
-        self.message_user(request, f'{queryset.count()} comments approved.')
+        post_ids = set(queryset.values_list('post_id', flat=True))
+        approved = queryset.update(active=True, flagged=False)
+        # update() skips the signal handlers, so recount active comments of the affected posts
+        recount_comments(post_ids)
+        invalidate_pages(*(f'post:{pk}' for pk in post_ids))
+        self.message_user(request, f'{approved} comments approved.')
     approve_comments.short_description = 'Approve selected comments'
     
     def flag_comments(self, request, queryset):
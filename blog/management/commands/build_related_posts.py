@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+import time
+
+from lib.related_posts import build_related_posts
+
+
+class Command(BaseCommand):
+    help = 'Recompute related posts for posts whose categories or tags changed (or all of them with --full)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Rebuild every published post')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--loop', action='store_true', help='Keep polling for posts flagged as stale')
+        parser.add_argument('--interval', type=float, default=30, help='Seconds to wait between polls in --loop mode')
+
+    def handle(self, *args, **options):
+        full = options['full']
+        try:
+            while True:
+                updated = build_related_posts(full=full, batch_size=options['batch_size'])
+                if updated or not options['loop']:
+                    self.stdout.write(self.style.SUCCESS(f'Related posts updated for {updated} posts'))
+                if not options['loop']:
+                    break
+                # Only the first pass of a looping --full run rebuilds everything
+                full = False
+                close_old_connections()
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.models import rebuild_taxonomy_stats
+
+
+class Command(BaseCommand):
+    help = 'Recount published posts per category and tag from scratch (repairs drift in the denormalized counts)'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            updated = rebuild_taxonomy_stats()
+        self.stdout.write(self.style.SUCCESS(f'{updated} categories and tags recounted'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from blog.models import reconcile_engagement_counts
+
+
+class Command(BaseCommand):
+    help = 'Recount likes and active comments from the relations and repair drifted counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        posts, comments = reconcile_engagement_counts(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{posts} posts and {comments} comments repaired'))
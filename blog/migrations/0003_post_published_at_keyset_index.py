@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-18 15:49
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_published_at(apps, schema_editor):
+    """Keyset pagination needs published_at on every published post"""
+    Post = apps.get_model('blog', 'Post')
+    Post.objects.filter(status='published', published_at__isnull=True).update(published_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0002_post_content_hash_post_content_html'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_published_at, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='post',
+            name='blog_post_status_615533_idx',
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['status', '-published_at', '-id'], name='blog_post_status_258d5d_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.4 on 2026-10-18 15:52
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_published_posts(apps, schema_editor):
+    """Seed the denormalized counts; the signal handlers keep them current afterwards"""
+    Post = apps.get_model('blog', 'Post')
+    for model_name, field in (('Category', 'category'), ('Tag', 'tag')):
+        model = apps.get_model('blog', model_name)
+        through = Post.categories.through if field == 'category' else Post.tags.through
+        published = (
+            through.objects
+            .filter(**{field: OuterRef('pk')}, post__status='published')
+            .values(field)
+            .annotate(total=Count('post'))
+            .values('total')
+        )
+        model.objects.update(published_post_count=Coalesce(Subquery(published), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0003_post_published_at_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='published_post_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='published_post_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['-published_post_count', 'name'], name='blog_catego_publish_3b8d46_idx'),
+        ),
+        migrations.RunPython(count_published_posts, migrations.RunPython.noop),
+    ]
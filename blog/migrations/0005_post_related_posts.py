@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 15:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0004_taxonomy_published_post_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='related_post_ids',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='related_stale',
+            field=models.BooleanField(default=True, editable=False),
+        ),
+    ]
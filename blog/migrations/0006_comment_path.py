@@ -0,0 +1,39 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_paths(apps, schema_editor):
+    """Fill in materialised paths level by level, starting at the thread roots"""
+    Comment = apps.get_model('blog', 'Comment')
+    paths = {}
+    level = list(Comment.objects.filter(parent__isnull=True).values_list('pk', 'parent_id'))
+    while level:
+        updates = []
+        for pk, parent_id in level:
+            paths[pk] = f'{paths.get(parent_id, "")}{pk:010d}/'
+            updates.append(Comment(pk=pk, path=paths[pk]))
+        Comment.objects.bulk_update(updates, ['path'], batch_size=500)
+        level = list(Comment.objects.filter(parent_id__in=[pk for pk, _ in level]).values_list('pk', 'parent_id'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0005_post_related_posts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(blank=True, editable=False, max_length=500),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'path'], name='blog_commen_post_id_34d25d_idx'),
+        ),
+        migrations.RunPython(backfill_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_engagement(apps, schema_editor):
+    """The counters were never maintained before; seed them from the relations"""
+    Post = apps.get_model('blog', 'Post')
+    Comment = apps.get_model('blog', 'Comment')
+
+    def count_of(queryset, field):
+        return Coalesce(Subquery(queryset.values(field).annotate(total=Count('pk')).values('total')), 0)
+
+    Post.objects.update(
+        likes_count=count_of(Post.liked_by.through.objects.filter(post=OuterRef('pk')), 'post'),
+        comments_count=count_of(Comment.objects.filter(post=OuterRef('pk'), active=True), 'post'),
+    )
+    Comment.objects.update(
+        likes_count=count_of(Comment.liked_by.through.objects.filter(comment=OuterRef('pk')), 'comment'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_comment_path'),
+    ]
+
+    operations = [
+        migrations.RunPython(count_engagement, migrations.RunPython.noop),
+    ]
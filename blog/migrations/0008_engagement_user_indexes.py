@@ -0,0 +1,34 @@
+from django.db import migrations
+
+# The auto-created liked_by / bookmarked_by tables only index user_id on its own;
+# the dashboard pages through a user's rows newest first, so index (user_id, id)
+INDEXED_RELATIONS = [
+    ('liked_by', 'blog_post_liked_by_user_id_idx'),
+    ('bookmarked_by', 'blog_post_bookmarked_by_user_id_idx'),
+]
+
+
+def create_indexes(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    quote = schema_editor.quote_name
+    for field, index_name in INDEXED_RELATIONS:
+        table = Post._meta.get_field(field).remote_field.through._meta.db_table
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {quote(index_name)} ON {quote(table)} ({quote("user_id")}, {quote("id")})'
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    for _, index_name in INDEXED_RELATIONS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {schema_editor.quote_name(index_name)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0007_reconcile_engagement_counts'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:09
+
+import blog.models
+import lib.image_ingest
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0009_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='featured_image',
+            field=models.ImageField(blank=True, null=True, upload_to=blog.models.post_media_upload_path, validators=[lib.image_ingest.validate_image_upload]),
+        ),
+    ]
@@ -1,9 +1,34 @@
+from django.core.cache import cache
 from django.db import models
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Concat, Greatest, Substr
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
 from django.contrib.auth.models import User
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.text import slugify
 from uuid import uuid4
 import os
+import random
+
+from lib.image_ingest import ingest_image, validate_image_upload
+from lib.image_variants import schedule_variants
+from lib.markdown_renderer import markdown_hash, render_markdown
+
+
+def exclude_denormalized_fields(instance, fields, save_kwargs):
+    """
+    Save existing rows without their denormalized columns. Counters are only
+    changed with F() updates (and precomputed columns by their builders), so
+    writing back the values loaded with the instance would undo changes made since.
+    """
+    if not instance._state.adding and save_kwargs.get('update_fields') is None:
+        save_kwargs['update_fields'] = [
+            field.name for field in instance._meta.concrete_fields
+            if not field.primary_key and field.name not in fields
+        ]
+
 
 def post_media_upload_path(instance, filename):
     """Generate upload path for post media files"""
@@ -38,6 +63,8 @@ class Post(models.Model):
     title = models.CharField(max_length=250)
     slug = models.SlugField(max_length=250, unique=True, blank=True)
     content = models.TextField()
+    content_html = models.TextField(blank=True, editable=False, help_text="Rendered markdown of content")
+    content_hash = models.CharField(max_length=64, blank=True, editable=False)
     excerpt = models.TextField(max_length=500, blank=True, help_text="Short description of the post")
     # Status and publishing
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='draft')
@@ -48,8 +75,12 @@ class Post(models.Model):
     meta_keywords = models.CharField(max_length=255, blank=True, help_text="SEO keywords (comma separated)")
     
     # Media
-    featured_image = models.ImageField(upload_to=post_media_upload_path, blank=True, null=True)
+    featured_image = models.ImageField(
+        upload_to=post_media_upload_path, blank=True, null=True, validators=[validate_image_upload],
+    )
     featured_image_alt = models.CharField(max_length=100, blank=True, help_text="Alt text for featured image")
+    # Resized WebP/JPEG copies of featured_image, written by lib/image_variants.py
+    featured_image_variants = models.JSONField(default=dict, blank=True, editable=False)
     
     # Engagement tracking
     views_count = models.PositiveIntegerField(default=0)
@@ -67,12 +98,16 @@ class Post(models.Model):
     
     # Reading time estimation (in minutes)
     reading_time = models.PositiveIntegerField(default=0, help_text="Estimated reading time in minutes")
+
+    # Precomputed by lib.related_posts from shared categories and tags
+    related_post_ids = models.JSONField(default=list, blank=True, editable=False)
+    related_stale = models.BooleanField(default=True, editable=False)
     
     class Meta:
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['-created_at']),
-            models.Index(fields=['status', '-published_at']),
+            models.Index(fields=['status', '-published_at', '-id']),
             models.Index(fields=['slug']),
             models.Index(fields=['featured', '-created_at']),
         ]
@@ -97,16 +132,45 @@ class Post(models.Model):
                     self.slug = f"{base_slug}-{str(self.uuid)[:8]}"
                 
         
+        # Listings are ordered and paginated by published_at, so published posts always have one
+        if self.status == 'published' and not self.published_at:
+            self.published_at = timezone.now()
+
         if not self.excerpt and self.content:
             self.excerpt = self.content[:300] + "..." if len(self.content) > 300 else self.content
         
         if self.content:
             word_count = len(self.content.split())
             self.reading_time = max(1, round(word_count / 200))
+
+        self.render_content()
         
+        exclude_denormalized_fields(
+            self, ('views_count', 'likes_count', 'comments_count', 'related_post_ids', 'related_stale',
+                   'featured_image_variants'), kwargs,
+        )
         super().save(*args, **kwargs)
     
 
+    def render_content(self):
+        """Re-render content_html if content or the markdown config changed. Returns True if rendered."""
+        current_hash = markdown_hash(self.content)
+        if self.content_hash == current_hash:
+            return False
+        self.content_html = render_markdown(self.content)
+        self.content_hash = current_hash
+        return True
+
+    def get_content_html(self):
+        """Return the stored HTML, refreshing it in place when the hash is stale"""
+        if self.render_content() and self.pk:
+            # Plain UPDATE so updated_at and save() side effects are left alone
+            Post.objects.filter(pk=self.pk).update(
+                content_html=self.content_html,
+                content_hash=self.content_hash,
+            )
+        return self.content_html
+
     def get_absolute_url(self):
         return reverse('blog:post_detail', kwargs={'slug': self.slug})
     
@@ -128,6 +192,9 @@ class Comment(models.Model):
     
     # Nested comments (replies)
     parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='replies')
+    # Materialised path of zero-padded ids from the thread root down to this comment,
+    # e.g. "0000000012/0000000045/". Sorting by it gives each thread depth-first.
+    path = models.CharField(max_length=500, blank=True, editable=False)
     
     # Moderation
     active = models.BooleanField(default=True)
@@ -146,10 +213,30 @@ class Comment(models.Model):
         indexes = [
             models.Index(fields=['post', 'active', 'created_at']),
             models.Index(fields=['parent']),
+            models.Index(fields=['post', 'path']),
         ]
     
     def __str__(self):
         return f'Comment by {self.author.username} on {self.post.title}'
+
+    def save(self, *args, **kwargs):
+        exclude_denormalized_fields(self, ('likes_count',), kwargs)
+        super().save(*args, **kwargs)
+        # The path needs our own id, so it is written after the insert
+        path = f'{self.parent.path if self.parent_id else ""}{self.pk:010d}/'
+        if path != self.path:
+            old_path = self.path
+            Comment.objects.filter(pk=self.pk).update(path=path)
+            if old_path:
+                # Moved to another parent: rewrite the paths of the whole subtree
+                Comment.objects.filter(post_id=self.post_id, path__startswith=old_path).exclude(pk=self.pk).update(
+                    path=Concat(Value(path), Substr('path', len(old_path) + 1))
+                )
+            self.path = path
+
+    @property
+    def depth(self):
+        return self.path.count('/') - 1
     
     def is_reply(self):
         return self.parent is not None
@@ -166,6 +253,9 @@ class Category(models.Model):
     
     # SEO
     meta_description = models.CharField(max_length=160, blank=True)
+
+    # Denormalized stats, kept in sync by the signal handlers below
+    published_post_count = models.PositiveIntegerField(default=0, editable=False)
     
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
@@ -173,6 +263,9 @@ class Category(models.Model):
     class Meta:
         verbose_name_plural = 'Categories'
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['-published_post_count', 'name']),
+        ]
     
     def __str__(self):
         return self.name
@@ -180,18 +273,22 @@ class Category(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
+        exclude_denormalized_fields(self, ('published_post_count',), kwargs)
         super().save(*args, **kwargs)
     
     def get_absolute_url(self):
         return reverse('blog:category_posts', kwargs={'slug': self.slug})
     
     def get_post_count(self):
-        return self.posts.filter(status='published').count()
+        return self.published_post_count
 
 
 class Tag(models.Model):
     name = models.CharField(max_length=50, unique=True)
     slug = models.SlugField(max_length=50, unique=True, blank=True)
+
+    # Denormalized stats, kept in sync by the signal handlers below
+    published_post_count = models.PositiveIntegerField(default=0, editable=False)
     
     created_at = models.DateTimeField(auto_now_add=True)
     
@@ -204,15 +301,318 @@ class Tag(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
+        exclude_denormalized_fields(self, ('published_post_count',), kwargs)
         super().save(*args, **kwargs)
     
     def get_absolute_url(self):
         return reverse('blog:tag_posts', kwargs={'slug': self.slug})
     
     def get_post_count(self):
-        return self.posts.filter(status='published').count()
+        return self.published_post_count
 
 
 # Add the many-to-many relationships to Post
 Post.add_to_class('categories', models.ManyToManyField(Category, blank=True, related_name='posts'))
-Post.add_to_class('tags', models.ManyToManyField(Tag, blank=True, related_name='posts'))
\ No newline at end of file
+Post.add_to_class('tags', models.ManyToManyField(Tag, blank=True, related_name='posts'))
+
+
+CATEGORY_IDS_CACHE_KEY = 'blog:category_ids'
+
+
+def get_category_ids():
+    """All category ids, cached until a category is saved or deleted"""
+    ids = cache.get(CATEGORY_IDS_CACHE_KEY)
+    if ids is None:
+        ids = list(Category.objects.order_by('pk').values_list('pk', flat=True))
+        cache.set(CATEGORY_IDS_CACHE_KEY, ids, None)
+    return ids
+
+
+def sample_categories(count):
+    """
+    `count` random categories. The sample is drawn from the cached id list and
+    only those rows are fetched by primary key, instead of ORDER BY RANDOM()
+    sorting the whole table on every request.
+    """
+    ids = get_category_ids()
+    picked = random.sample(ids, min(count, len(ids)))
+    by_id = Category.objects.in_bulk(picked)
+    # A category deleted since the ids were cached is simply skipped
+    return [by_id[pk] for pk in picked if pk in by_id]
+
+
+@receiver([post_save, post_delete], sender=Category)
+def category_changed(sender, instance, **kwargs):
+    """Drop the cached id list whenever a category is saved or deleted"""
+    cache.delete(CATEGORY_IDS_CACHE_KEY)
+
+
+def mark_related_stale(post_ids):
+    """
+    Flag posts for the incremental related-posts build. The build reloads
+    the whole taxonomy, so it runs in `manage.py build_related_posts --loop`
+    rather than in the request that changed the post.
+    """
+    post_ids = list(post_ids)
+    if not post_ids:
+        return
+    Post.objects.filter(pk__in=post_ids).update(related_stale=True)
+
+
+# Taxonomy stats: published post counts per Category and Tag
+TAXONOMY_LINKS = {
+    Category: (Post.categories.through, 'category'),
+    Tag: (Post.tags.through, 'tag'),
+}
+
+
+def adjust_counter(model, pks, field, delta):
+    """Atomically add `delta` to a counter column of the given rows, never going below zero"""
+    pks = list(pks)
+    if not pks or not delta:
+        return
+    model.objects.filter(pk__in=pks).update(**{field: Greatest(F(field) + delta, 0)})
+
+
+def adjust_published_post_count(model, pks, delta):
+    """Add `delta` to the published_post_count of the given Category or Tag rows"""
+    adjust_counter(model, pks, 'published_post_count', delta)
+
+
+def rebuild_taxonomy_stats(posts=None):
+    """
+    Recount published posts for every Category and Tag from the link tables.
+    With `posts` (a queryset or list of ids), only the categories and tags
+    attached to those posts are recounted.
+    """
+    updated = 0
+    for model, (through, field) in TAXONOMY_LINKS.items():
+        targets = model.objects.all()
+        if posts is not None:
+            targets = targets.filter(pk__in=through.objects.filter(post__in=posts).values(f'{field}_id'))
+        published = (
+            through.objects
+            .filter(**{field: OuterRef('pk')}, post__status='published')
+            .values(field)
+            .annotate(total=Count('post'))
+            .values('total')
+        )
+        updated += targets.update(published_post_count=Coalesce(Subquery(published), 0))
+    return updated
+
+
+@receiver(m2m_changed, sender=Post.categories.through)
+@receiver(m2m_changed, sender=Post.tags.through)
+def post_taxonomy_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keep published_post_count in step with categories/tags being added to or removed from posts"""
+    if action not in ('post_add', 'pre_remove', 'pre_clear'):
+        return
+    model = Category if sender is Post.categories.through else Tag
+    field = TAXONOMY_LINKS[model][1]
+
+    if not reverse:
+        mark_related_stale([instance.pk])
+    elif pk_set is not None:
+        mark_related_stale(pk_set)
+    else:
+        mark_related_stale(sender.objects.filter(**{field: instance}).values_list('post_id', flat=True))
+    # Removals are counted before the rows go, and only for links that actually exist
+    delta = 1 if action == 'post_add' else -1
+
+    if not reverse:
+        # instance is a Post, pk_set holds Category/Tag ids
+        if instance.status != 'published':
+            return
+        if action == 'post_add':
+            pks = pk_set
+        else:
+            links = sender.objects.filter(post=instance)
+            if pk_set is not None:
+                links = links.filter(**{f'{field}_id__in': pk_set})
+            pks = links.values_list(f'{field}_id', flat=True)
+        adjust_published_post_count(model, pks, delta)
+        return
+
+    # instance is a Category/Tag, pk_set holds Post ids
+    if action == 'post_add':
+        changed = Post.objects.filter(pk__in=pk_set, status='published').count()
+    else:
+        links = sender.objects.filter(**{field: instance}, post__status='published')
+        if pk_set is not None:
+            links = links.filter(post_id__in=pk_set)
+        changed = links.count()
+    adjust_published_post_count(model, [instance.pk], delta * changed)
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_status(sender, instance, raw=False, **kwargs):
+    """Remember whether the stored row was published, to detect status transitions in post_save"""
+    if raw or instance.pk is None:
+        instance._was_published = False
+        return
+    instance._was_published = Post.objects.filter(pk=instance.pk, status='published').exists()
+
+
+@receiver(post_save, sender=Post)
+def post_status_changed(sender, instance, raw=False, **kwargs):
+    """Count or uncount the post in its categories and tags when it is published or unpublished"""
+    if raw:
+        return
+    is_published = instance.status == 'published'
+    if is_published == getattr(instance, '_was_published', False):
+        return
+    delta = 1 if is_published else -1
+    adjust_published_post_count(Category, instance.categories.values_list('pk', flat=True), delta)
+    adjust_published_post_count(Tag, instance.tags.values_list('pk', flat=True), delta)
+    mark_related_stale([instance.pk])
+
+
+@receiver(pre_save, sender=Post)
+def featured_image_uploaded(sender, instance, raw=False, **kwargs):
+    """Downscale, strip and recompress a new upload before it is stored"""
+    if not raw:
+        ingest_image(instance.featured_image)
+
+
+@receiver(post_save, sender=Post)
+def featured_image_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_variants(instance, 'featured_image')
+
+
+@receiver(pre_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    """The link rows are cascaded without m2m_changed, so uncount a published post here"""
+    if instance.status != 'published':
+        return
+    # Every post that can list this one shares a category or tag with it
+    neighbours = Post.objects.filter(
+        Q(categories__in=instance.categories.all()) | Q(tags__in=instance.tags.all())
+    ).exclude(pk=instance.pk).values_list('pk', flat=True).distinct()
+    mark_related_stale(neighbours)
+    adjust_published_post_count(Category, instance.categories.values_list('pk', flat=True), -1)
+    adjust_published_post_count(Tag, instance.tags.values_list('pk', flat=True), -1)
+
+
+@receiver(pre_delete, sender=Category)
+@receiver(pre_delete, sender=Tag)
+def taxonomy_deleted(sender, instance, **kwargs):
+    """Deleting a category or tag changes the taxonomy of all its posts"""
+    mark_related_stale(instance.posts.values_list('pk', flat=True))
+
+
+# Engagement counters: Post.likes_count, Post.comments_count (active comments) and Comment.likes_count
+@receiver(m2m_changed, sender=Post.liked_by.through)
+@receiver(m2m_changed, sender=Comment.liked_by.through)
+def likes_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keep likes_count in step with liked_by, counting removals before the rows go"""
+    if action not in ('post_add', 'pre_remove', 'pre_clear'):
+        return
+    model, field = (Post, 'post') if sender is Post.liked_by.through else (Comment, 'comment')
+    delta = 1 if action == 'post_add' else -1
+
+    if not reverse:
+        # instance is the liked Post/Comment, pk_set holds User ids
+        if action == 'post_add':
+            changed = len(pk_set)
+        else:
+            links = sender.objects.filter(**{field: instance})
+            if pk_set is not None:
+                links = links.filter(user_id__in=pk_set)
+            changed = links.count()
+        adjust_counter(model, [instance.pk], 'likes_count', delta * changed)
+        return
+
+    # instance is a User, pk_set holds Post/Comment ids
+    if action == 'post_add':
+        pks = pk_set
+    else:
+        links = sender.objects.filter(user=instance)
+        if pk_set is not None:
+            links = links.filter(**{f'{field}_id__in': pk_set})
+        pks = links.values_list(f'{field}_id', flat=True)
+    adjust_counter(model, pks, 'likes_count', delta)
+
+
+@receiver(pre_save, sender=Comment)
+def remember_comment_state(sender, instance, raw=False, **kwargs):
+    """Remember the stored post and active flag, to move comments_count in post_save"""
+    instance._counted_post_id = None
+    if raw or instance.pk is None:
+        return
+    previous = Comment.objects.filter(pk=instance.pk).values('post_id', 'active').first()
+    if previous and previous['active']:
+        instance._counted_post_id = previous['post_id']
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    counted_post_id = getattr(instance, '_counted_post_id', None)
+    new_post_id = instance.post_id if instance.active else None
+    if counted_post_id != new_post_id:
+        adjust_counter(Post, [counted_post_id] if counted_post_id else [], 'comments_count', -1)
+        adjust_counter(Post, [new_post_id] if new_post_id else [], 'comments_count', 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    if instance.active:
+        adjust_counter(Post, [instance.post_id], 'comments_count', -1)
+
+
+def recount_comments(post_ids):
+    """Recount active comments for the given posts (after bulk moderation with update())"""
+    active_comments = (
+        Comment.objects
+        .filter(post=OuterRef('pk'), active=True)
+        .values('post')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Post.objects.filter(pk__in=list(post_ids)).update(
+        comments_count=Coalesce(Subquery(active_comments), 0)
+    )
+
+
+def reconcile_engagement_counts(batch_size=1000):
+    """
+    Recompute every engagement counter from the like and comment tables, in
+    primary key batches, and rewrite only the rows that drifted. Returns
+    (posts fixed, comments fixed).
+    """
+    def count_of(queryset, field):
+        return Coalesce(Subquery(queryset.values(field).annotate(total=Count('pk')).values('total')), 0)
+
+    post_likes = count_of(Post.liked_by.through.objects.filter(post=OuterRef('pk')), 'post')
+    post_comments = count_of(Comment.objects.filter(post=OuterRef('pk'), active=True), 'post')
+    comment_likes = count_of(Comment.liked_by.through.objects.filter(comment=OuterRef('pk')), 'comment')
+
+    jobs = [
+        (Post, {'likes_count': post_likes, 'comments_count': post_comments}),
+        (Comment, {'likes_count': comment_likes}),
+    ]
+    fixed = []
+    for model, counters in jobs:
+        total = 0
+        last_pk = 0
+        while True:
+            batch = list(
+                model.objects.filter(pk__gt=last_pk).order_by('pk')
+                .annotate(**{f'real_{field}': expression for field, expression in counters.items()})
+                .values('pk', *counters, *(f'real_{field}' for field in counters))[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1]['pk']
+            drifted = [
+                model(pk=row['pk'], **{field: row[f'real_{field}'] for field in counters})
+                for row in batch
+                if any(row[field] != row[f'real_{field}'] for field in counters)
+            ]
+            if drifted:
+                model.objects.bulk_update(drifted, list(counters))
+                total += len(drifted)
+        fixed.append(total)
+    return tuple(fixed)
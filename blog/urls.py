@@ -1,10 +1,18 @@
 from django.urls import path
 from .views import (
+    blog_dashboard,
     blog_home,
     blog_post,
+    comment_engagement,
+    engagement_state_view,
+    post_engagement,
 )
 
 urlpatterns = [
     path('', blog_home, name='blog_home_page'),
+    path('me/<str:kind>/', blog_dashboard, name='blog_dashboard'),
+    path('engagement/state/', engagement_state_view, name='blog_engagement_state'),
+    path('engagement/posts/<int:pk>/<str:action>/', post_engagement, name='blog_post_engagement'),
+    path('engagement/comments/<int:pk>/<str:action>/', comment_engagement, name='blog_comment_engagement'),
     path('<slug:slug>/', blog_post, name='blog_post'),
 ]
\ No newline at end of file
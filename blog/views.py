@@ -1,70 +1,202 @@
 from django.shortcuts import render
 from django.shortcuts import get_object_or_404
-from django.core.paginator import Paginator
-from django.db.models import Count
-import markdown
-
-from .models import Post, Category
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.http import Http404
+from django.db.models import Prefetch
+from django.http import JsonResponse
+from django.utils.functional import SimpleLazyObject
+from django.views.decorators.csrf import ensure_csrf_cookie
+from django.views.decorators.http import require_GET, require_POST
+
+from .models import Post, Comment, Category, sample_categories
+from lib.comment_tree import load_comment_threads
+from lib.engagement import engagement_state, set_engagement
+from lib.keyset_pagination import paginate_keyset
+from lib.page_cache import add_page_tags
 from lib.subscribe_newsletter import subscribe_newsletter
+from lib.view_counter import get_post_view_counter
 
 
 
 # Create your views here.
 def blog_home(request):
-    # Get all published posts
-    posts = Post.objects.filter(status='published').select_related('author').prefetch_related(
-        'categories', 
-        'tags', 
-        'liked_by', 
-        'bookmarked_by',
-        'comments'
-
-    ).order_by('-created_at')
+    # Only the columns the cards render, and at most 4 categories per card
+    posts = Post.objects.filter(status='published').select_related('author').only(
+        'title', 'slug', 'excerpt', 'featured_image', 'featured_image_variants', 'published_at', 'author__username',
+    ).prefetch_related(
+        Prefetch('categories', queryset=Category.objects.only('id', 'name')[:4], to_attr='card_categories'),
+    )
 
-    paginator = Paginator(posts, 8)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Keyset pagination on (published_at, id): no COUNT(*) and no OFFSET scan on deep pages
+    page_obj = paginate_keyset(posts, request.GET.get('cursor'), per_page=8)
 
 
-    top_categories = Category.objects.annotate(post_count=Count('posts')).order_by('-post_count')[:4]
+    # Published post counts are denormalized onto Category, no aggregate per request
+    top_categories = Category.objects.order_by('-published_post_count', 'name')[:4]
 
 
-    # Get 6 random categories
-    all_categories = Category.objects.order_by('?')[:6]
+    # Get 6 random categories, sampled from a cached id list rather than ORDER BY RANDOM()
+    # Lazy, so the rows are only fetched if the template uses them
+    all_categories = SimpleLazyObject(lambda: sample_categories(6))
    
     form = subscribe_newsletter(request)
     context = {
-        'posts' : posts,
         'form' : form,
         'all_categories' : all_categories,
         'page_obj' : page_obj,
         'top_categories' : top_categories,
     }
+    add_page_tags(request, 'posts', 'categories')
     return render(request, 'blog/blog_home.html', context=context)
 
 
+# Dashboard lists: through table of the relation and the page heading
+DASHBOARD_LISTS = {
+    'bookmarks': (Post.bookmarked_by.through, 'My bookmarks'),
+    'likes': (Post.liked_by.through, 'My likes'),
+}
+
+
+@login_required
+def blog_dashboard(request, kind):
+    if kind not in DASHBOARD_LISTS:
+        raise Http404
+    through, heading = DASHBOARD_LISTS[kind]
+
+    # Page over the user's link rows newest first by their id, served by the (user_id, id) index;
+    # the post card columns come in the same query and categories in one more
+    links = through.objects.filter(user=request.user, post__status='published').select_related(
+        'post', 'post__author',
+    ).only(
+        'post__title', 'post__slug', 'post__excerpt', 'post__featured_image', 'post__featured_image_variants',
+        'post__published_at',
+        'post__author__username',
+    ).prefetch_related(
+        Prefetch('post__categories', queryset=Category.objects.only('id', 'name')[:4], to_attr='card_categories'),
+    )
+    page_obj = paginate_keyset(
+        links, request.GET.get('cursor'), per_page=settings.DASHBOARD_POSTS_PER_PAGE,
+        fields=('id',), datetime_fields=(),
+    )
+
+    context = {
+        'kind': kind,
+        'heading': heading,
+        'page_obj': page_obj,
+        'posts': [link.post for link in page_obj],
+    }
+    return render(request, 'blog/dashboard.html', context=context)
+
+
 def blog_post(request, slug):
     post = get_object_or_404(Post, slug=slug, status='published')    
     
-    # Convert markdown content
-    md = markdown.Markdown(extensions=[
-        'extra',
-        'tables',
-    ])
-    converted = md.convert(post.content)
-    post.content = converted
-
-    # Increment view count
-    post.views_count += 1
-    post.save(update_fields=['views_count'])
+    # Pre-rendered markdown, only re-rendered when the content hash is stale
+    content_html = post.get_content_html()
+
+    # Buffered view count, flushed to the database in batches.
+    # The row was read before this view is recorded, so show it on top of the pending ones.
+    view_counter = get_post_view_counter()
+    post.views_count += view_counter.pending(post.pk) + 1
+    view_counter.record(post.pk)
+
+    # Precomputed neighbours, loaded with a single id__in query and kept in their ranked order
+    related = Post.objects.filter(pk__in=post.related_post_ids, status='published').only(
+        'title', 'slug', 'excerpt', 'featured_image', 'featured_image_variants', 'published_at',
+    ).in_bulk()
+    related_posts = [related[pk] for pk in post.related_post_ids if pk in related]
+
+    # A page of top-level threads with their nested replies, authors joined
+    comment_threads = load_comment_threads(post, after=request.GET.get('comments_after'))
 
     context = {
         'post': post,
+        'content_html': content_html,
+        'related_posts': related_posts,
+        'comment_threads': comment_threads,
         'reading_time': post.reading_time,
         'views_count': post.views_count,
-        'likes_count': post.get_like_count(),
-        'comments_count': post.get_comment_count(),
+        # Denormalized counters, maintained by the signal handlers in blog/models.py
+        'likes_count': post.likes_count,
+        'comments_count': post.comments_count,
     }
+    # Cached pages still count the view, the counter shown is the one from when the page was rendered
+    add_page_tags(
+        request, f'post:{post.pk}', *(f'post:{pk}' for pk in related),
+        on_hit=('lib.view_counter.record_post_view', [post.pk]),
+    )
     return render(request, 'blog/blog_post.html', context=context)
 
 
+# Engagement API: like/bookmark state changes are explicit (like/unlike), so retries and double-clicks are harmless
+POST_ACTIONS = {
+    'like': ('post_like', True),
+    'unlike': ('post_like', False),
+    'bookmark': ('post_bookmark', True),
+    'unbookmark': ('post_bookmark', False),
+}
+COMMENT_ACTIONS = {
+    'like': ('comment_like', True),
+    'unlike': ('comment_like', False),
+}
+ENGAGEMENT_STATE_MAX_IDS = 100
+
+
+def _login_required_json():
+    return JsonResponse({'error': 'Log in to like or bookmark.'}, status=401)
+
+
+@require_POST
+def post_engagement(request, pk, action):
+    if action not in POST_ACTIONS:
+        return JsonResponse({'error': 'Unknown action.'}, status=404)
+    if not request.user.is_authenticated:
+        return _login_required_json()
+    get_object_or_404(Post.objects.only('pk'), pk=pk, status='published')
+
+    relation, on = POST_ACTIONS[action]
+    count = set_engagement(relation, pk, request.user, on)
+    state = engagement_state(request.user, post_ids=[pk])['posts'][pk]
+    if count is not None:
+        state['likes_count'] = count
+    return JsonResponse(state)
+
+
+@require_POST
+def comment_engagement(request, pk, action):
+    if action not in COMMENT_ACTIONS:
+        return JsonResponse({'error': 'Unknown action.'}, status=404)
+    if not request.user.is_authenticated:
+        return _login_required_json()
+    get_object_or_404(Comment.objects.only('pk'), pk=pk, active=True, post__status='published')
+
+    relation, on = COMMENT_ACTIONS[action]
+    count = set_engagement(relation, pk, request.user, on)
+    return JsonResponse({'liked': on, 'likes_count': count})
+
+
+def _parse_ids(value):
+    ids = []
+    for part in value.split(',')[:ENGAGEMENT_STATE_MAX_IDS]:
+        if part.strip().isdigit():
+            ids.append(int(part))
+    return ids
+
+
+@require_GET
+@ensure_csrf_cookie
+def engagement_state_view(request):
+    """Like/bookmark state of up to 100 posts (?posts=1,2,3) and comments (?comments=4,5) for the current user"""
+    state = engagement_state(
+        request.user,
+        post_ids=_parse_ids(request.GET.get('posts', '')),
+        comment_ids=_parse_ids(request.GET.get('comments', '')),
+    )
+    response = JsonResponse({
+        kind: {str(pk): values for pk, values in states.items()}
+        for kind, states in state.items()
+    })
+    # Per-user answer; it also sets the CSRF cookie the like/bookmark POSTs send back
+    response['Cache-Control'] = 'private, no-cache'
+    return response
@@ -1,7 +1,10 @@
 from django.contrib import admin
 from django.urls import reverse
+from django.utils import timezone
+from django.db.models import Sum
+from django.template.defaultfilters import filesizeformat
 from django.utils.html import format_html
-from .models import Contact, EmailSubscription
+from .models import Contact, EmailSubscription, GitHubActivitySnapshot, ImageIngest, Newsletter, OutboxEmail, StoredBlob
 
 
 class ContactAdmin(admin.ModelAdmin):
@@ -27,7 +30,108 @@ class EmailSubscriptionAdmin(admin.ModelAdmin):
     unsubscribe_link.short_description = "Unsubscribe Link"
 
 
-admin.site.register(Contact, ContactAdmin)
-admin.site.register(EmailSubscription, EmailSubscriptionAdmin)
+class GitHubActivitySnapshotAdmin(admin.ModelAdmin):
+    list_display = ['username', 'fetched_at', 'refresh_started_at']
+    readonly_fields = ['username', 'data', 'etags', 'fetched_at', 'refresh_started_at']
+
+    def has_add_permission(self, request):
+        return False
+
+
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ['id', 'subject', 'to', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['to', 'subject']
+    readonly_fields = [field.name for field in OutboxEmail._meta.fields]
+    actions = ['retry_now']
+
+    def has_add_permission(self, request):
+        return False
+
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status='sent').update(status='pending', next_attempt_at=timezone.now())
+        self.message_user(request, f'{updated} emails queued for another attempt.')
+    retry_now.short_description = 'Retry selected emails now'
+
+
+class NewsletterAdmin(admin.ModelAdmin):
+    list_display = ['subject', 'status', 'sent_count', 'failed_count', 'created_at', 'finished_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['subject']
+    readonly_fields = [
+        'last_subscriber_id', 'sent_count', 'failed_count', 'claimed_at', 'heartbeat_at',
+        'created_at', 'started_at', 'finished_at',
+    ]
+    actions = ['queue_broadcast']
+
+    def queue_broadcast(self, request, queryset):
+        """Hand the newsletters to `manage.py send_newsletters`, which does the actual sending"""
+        updated = queryset.filter(status='draft').update(status='queued')
+        self.message_user(request, f'{updated} newsletters queued for broadcast.')
+    queue_broadcast.short_description = 'Broadcast selected newsletters to all subscribers'
+
+
+class ImageIngestAdmin(admin.ModelAdmin):
+    list_display = ['name', 'format', 'original', 'stored', 'saved', 'dimensions', 'created_at']
+    list_filter = ['format', 'created_at']
+    search_fields = ['name']
+    readonly_fields = [field.name for field in ImageIngest._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def original(self, obj):
+        return filesizeformat(obj.original_size)
+    original.short_description = 'Uploaded'
+    original.admin_order_field = 'original_size'
+
+    def stored(self, obj):
+        return filesizeformat(obj.stored_size)
+    stored.short_description = 'Stored'
+    stored.admin_order_field = 'stored_size'
+
+    def saved(self, obj):
+        return filesizeformat(obj.bytes_saved)
+    saved.short_description = 'Saved'
+    saved.admin_order_field = 'bytes_saved'
 
+    def dimensions(self, obj):
+        return f'{obj.original_width}x{obj.original_height} -> {obj.stored_width}x{obj.stored_height}'
+    dimensions.short_description = 'Dimensions'
 
+    def changelist_view(self, request, extra_context=None):
+        totals = ImageIngest.objects.aggregate(saved=Sum('bytes_saved'), uploaded=Sum('original_size'))
+        extra_context = extra_context or {}
+        extra_context['title'] = (
+            f"Image ingests: {filesizeformat(totals['saved'] or 0)} saved "
+            f"of {filesizeformat(totals['uploaded'] or 0)} uploaded"
+        )
+        return super().changelist_view(request, extra_context=extra_context)
+
+
+class StoredBlobAdmin(admin.ModelAdmin):
+    list_display = ['name', 'size_display', 'ref_count', 'unreferenced_since', 'created_at']
+    list_filter = ['unreferenced_since']
+    search_fields = ['name']
+    readonly_fields = [field.name for field in StoredBlob._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        # Files are only removed by `manage.py sweep_media`
+        return False
+
+    def size_display(self, obj):
+        return filesizeformat(obj.size)
+    size_display.short_description = 'Size'
+    size_display.admin_order_field = 'size'
+
+
+admin.site.register(Contact, ContactAdmin)
+admin.site.register(EmailSubscription, EmailSubscriptionAdmin)
+admin.site.register(GitHubActivitySnapshot, GitHubActivitySnapshotAdmin)
+admin.site.register(OutboxEmail, OutboxEmailAdmin)
+admin.site.register(Newsletter, NewsletterAdmin)
+admin.site.register(ImageIngest, ImageIngestAdmin)
+admin.site.register(StoredBlob, StoredBlobAdmin)
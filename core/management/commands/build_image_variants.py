@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from lib.image_variants import build_all_variants
+
+
+class Command(BaseCommand):
+    help = 'Build resized WebP/JPEG variants for uploaded images that are missing them (or all of them with --force)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Rebuild every image, not only missing or stale ones')
+
+    def handle(self, *args, **options):
+        built, failed = build_all_variants(force=options['force'])
+        self.stdout.write(self.style.SUCCESS(f'Image variants built for {built} images, {failed} failed'))
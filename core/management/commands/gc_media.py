@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.template.defaultfilters import filesizeformat
+
+from lib.media_gc import collect_orphans
+
+
+class Command(BaseCommand):
+    help = (
+        'Report (or with --delete remove) files under MEDIA_ROOT that no Post, ProjectImage or Resume '
+        'references, e.g. left behind by queryset deletes or failed saves'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--delete', action='store_true', help='Delete the orphans instead of only reporting them')
+        parser.add_argument(
+            '--grace-hours', type=float, default=settings.MEDIA_SWEEP_GRACE_HOURS,
+            help='Ignore files modified more recently than this',
+        )
+        parser.add_argument('--list', action='store_true', help='Print every orphan')
+
+    def handle(self, *args, **options):
+        def on_orphan(name, size):
+            if options['list']:
+                self.stdout.write(f'{size:>12}  {name}')
+
+        report = collect_orphans(
+            grace_seconds=options['grace_hours'] * 3600,
+            delete=options['delete'],
+            on_orphan=on_orphan,
+        )
+        for directory, size in report.by_directory.most_common():
+            self.stdout.write(f'  {directory}/: {filesizeformat(size)}')
+        if report.skipped_recent:
+            self.stdout.write(f'{report.skipped_recent} unreferenced files are newer than the grace period, kept')
+        if options['delete']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Deleted {report.deleted} of {report.files} orphaned files, {filesizeformat(report.deleted_bytes)} reclaimed'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'{report.files} orphaned files, {filesizeformat(report.bytes)} reclaimable (dry run, use --delete)'
+            ))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from lib.page_cache import PageCacheStats
+
+
+class Command(BaseCommand):
+    help = 'Show the page cache hit, miss and bypass counts of all workers (flushed every few seconds)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Set the counters back to zero after printing them')
+
+    def handle(self, *args, **options):
+        totals = PageCacheStats.totals()
+        cacheable = totals['hit'] + totals['miss']
+        for outcome, count in totals.items():
+            self.stdout.write(f'{outcome:>8}: {count}')
+        if cacheable:
+            self.stdout.write(self.style.SUCCESS(f'Hit ratio: {totals["hit"] / cacheable:.1%} of {cacheable} anonymous GETs'))
+        else:
+            self.stdout.write('No anonymous GETs recorded yet')
+        if options['reset']:
+            PageCacheStats.reset()
+            self.stdout.write('Counters reset')
@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import GitHubActivitySnapshot
+from lib.github_activity import refresh_github_activity
+
+
+class Command(BaseCommand):
+    help = 'Fetch the GitHub activity feed now and store it as the homepage snapshot'
+
+    def handle(self, *args, **options):
+        snapshot, _ = GitHubActivitySnapshot.objects.get_or_create(username=settings.GITHUB_USERNAME)
+        if not refresh_github_activity(snapshot):
+            raise CommandError('GitHub activity refresh failed, the previous snapshot was kept')
+        snapshot.refresh_from_db()
+        self.stdout.write(self.style.SUCCESS(f'Stored {len(snapshot.data)} repositories for {snapshot.username}'))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from blog.models import Post
+from projects.models import Project
+
+
+class Command(BaseCommand):
+    help = 'Re-render stored markdown HTML for posts and projects (run after changing MARKDOWN_EXTENSIONS)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Re-render everything, even if the hash is current')
+        parser.add_argument('--batch-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        jobs = [
+            (Post, 'content', 'render_content', ['content_html', 'content_hash']),
+            (Project, 'description', 'render_description', ['description_html', 'description_hash']),
+        ]
+        for model, source_field, render_method, fields in jobs:
+            rendered = self.render_all(model, source_field, render_method, fields, options)
+            self.stdout.write(self.style.SUCCESS(f'{model.__name__}: {rendered} re-rendered'))
+
+    def render_all(self, model, source_field, render_method, fields, options):
+        batch_size = options['batch_size']
+        queryset = model.objects.only('pk', source_field, *fields).order_by('pk')
+        batch = []
+        rendered = 0
+        for obj in queryset.iterator(chunk_size=batch_size):
+            if options['force']:
+                setattr(obj, fields[1], '')
+            if getattr(obj, render_method)():
+                batch.append(obj)
+            if len(batch) >= batch_size:
+                model.objects.bulk_update(batch, fields)
+                rendered += len(batch)
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, fields)
+            rendered += len(batch)
+        return rendered
@@ -0,0 +1,54 @@
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+import time
+
+from core.models import Newsletter
+from lib.newsletter_broadcast import broadcast_newsletter, claim_newsletter
+
+
+class Command(BaseCommand):
+    help = 'Broadcast queued newsletters to all subscribers, resuming from the last checkpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--newsletter', type=int, help='Only send this newsletter id')
+        parser.add_argument('--resume', action='store_true', help="Also pick up newsletters left in 'sending' whose worker stopped renewing its lease")
+        parser.add_argument('--rate', type=float, help='Emails per second (default: NEWSLETTER_SEND_RATE, 0 = unthrottled)')
+        parser.add_argument('--chunk-size', type=int, help='Subscribers fetched per database round-trip')
+        parser.add_argument('--loop', action='store_true', help='Keep polling for queued newsletters')
+        parser.add_argument('--interval', type=float, default=30, help='Seconds to wait between polls in --loop mode')
+
+    def handle(self, *args, **options):
+        while True:
+            ids = self.get_candidate_ids(options)
+            if options['newsletter'] and not ids:
+                raise CommandError(f"Newsletter {options['newsletter']} is not queued (use --resume for an interrupted one)")
+
+            for newsletter_id in ids:
+                newsletter = claim_newsletter(newsletter_id, resume=options['resume'])
+                if newsletter is None:
+                    continue  # Claimed by another worker in the meantime
+                self.stdout.write(f'Sending "{newsletter.subject}" from subscriber #{newsletter.last_subscriber_id}')
+                connection = get_connection()
+                try:
+                    sent, failed = broadcast_newsletter(
+                        newsletter,
+                        connection=connection,
+                        chunk_size=options['chunk_size'],
+                        rate=options['rate'],
+                    )
+                finally:
+                    connection.close()
+                self.stdout.write(self.style.SUCCESS(f'"{newsletter.subject}": {sent} sent, {failed} failed'))
+
+            if not options['loop'] or options['newsletter']:
+                break
+            close_old_connections()
+            time.sleep(options['interval'])
+
+    def get_candidate_ids(self, options):
+        statuses = ['queued', 'sending'] if options['resume'] else ['queued']
+        queryset = Newsletter.objects.filter(status__in=statuses).order_by('created_at')
+        if options['newsletter']:
+            queryset = queryset.filter(pk=options['newsletter'])
+        return list(queryset.values_list('pk', flat=True))
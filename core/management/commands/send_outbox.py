@@ -0,0 +1,39 @@
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+import time
+
+from lib.emails_hanlder import deliver_outbox
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued outbox emails over one persistent mail connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep polling the outbox instead of exiting when it is empty')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds to wait between polls in --loop mode')
+        parser.add_argument('--batch-size', type=int, default=50)
+
+    def handle(self, *args, **options):
+        connection = get_connection()
+        total_sent = total_failed = 0
+        try:
+            while True:
+                sent, failed = deliver_outbox(connection=connection, batch_size=options['batch_size'])
+                total_sent += sent
+                total_failed += failed
+                if sent or failed:
+                    self.stdout.write(f'Sent {sent}, failed {failed}')
+                    continue
+                if not options['loop']:
+                    break
+                # Idle: drop the SMTP session instead of letting the server time it out
+                connection.close()
+                close_old_connections()
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            connection.close()
+
+        self.stdout.write(self.style.SUCCESS(f'Done: {total_sent} sent, {total_failed} failed'))
@@ -0,0 +1,23 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from lib.content_storage import rebuild_references, sweep_unreferenced
+
+
+class Command(BaseCommand):
+    help = 'Delete media files that no model has referenced for the grace period'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=float, default=settings.MEDIA_SWEEP_GRACE_HOURS)
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help='Recount references from the model fields first (after a restore or on first use)',
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            referenced = rebuild_references()
+            self.stdout.write(f'{referenced} referenced files recounted')
+        removed, freed = sweep_unreferenced(timedelta(hours=options['grace_hours']))
+        self.stdout.write(self.style.SUCCESS(f'Removed {removed} unreferenced files ({freed} bytes)'))
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-18 15:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GitHubActivitySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('username', models.CharField(max_length=100, unique=True)),
+                ('data', models.JSONField(blank=True, default=list)),
+                ('fetched_at', models.DateTimeField(blank=True, null=True)),
+                ('refresh_started_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'GitHub Activity Snapshot',
+                'verbose_name_plural': 'GitHub Activity Snapshots',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 15:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_githubactivitysnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='githubactivitysnapshot',
+            name='etags',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
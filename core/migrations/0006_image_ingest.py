@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_newsletter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageIngest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Storage name of the stored file', max_length=500)),
+                ('format', models.CharField(max_length=10)),
+                ('original_size', models.PositiveBigIntegerField()),
+                ('stored_size', models.PositiveBigIntegerField()),
+                ('bytes_saved', models.BigIntegerField()),
+                ('original_width', models.PositiveIntegerField()),
+                ('original_height', models.PositiveIntegerField()),
+                ('stored_width', models.PositiveIntegerField()),
+                ('stored_height', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Image Ingest',
+                'verbose_name_plural': 'Image Ingests',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
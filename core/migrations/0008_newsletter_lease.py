@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_stored_blob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='newsletter',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='newsletter',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
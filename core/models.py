@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from uuid import uuid4
 from phonenumber_field.modelfields import PhoneNumberField
 
@@ -36,4 +37,132 @@ class Contact(models.Model):
     
     @property
     def full_name(self):
-        return f"{self.name} {self.last_name}"
\ No newline at end of file
+        return f"{self.name} {self.last_name}"
+
+class GitHubActivitySnapshot(models.Model):
+    """Last fetched GitHub activity feed, served on the homepage and refreshed in the background"""
+    username = models.CharField(max_length=100, unique=True)
+    data = models.JSONField(default=list, blank=True)
+    # Conditional request cache: {url: {'etag': ..., 'body': ...}}
+    etags = models.JSONField(default=dict, blank=True)
+    fetched_at = models.DateTimeField(null=True, blank=True)
+    # Set while a refresh is running so only one process talks to GitHub at a time
+    refresh_started_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'GitHub Activity Snapshot'
+        verbose_name_plural = 'GitHub Activity Snapshots'
+
+    def __str__(self):
+        return f"{self.username} - {self.fetched_at}"
+
+
+
+class OutboxEmail(models.Model):
+    """Email queued by a request and delivered later by `manage.py send_outbox`"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    to = models.EmailField()
+    content_subtype = models.CharField(max_length=20, default='html')
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        verbose_name = 'Outbox Email'
+        verbose_name_plural = 'Outbox Emails'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.to} ({self.status})"
+
+
+
+class Newsletter(models.Model):
+    """Newsletter issue broadcast to every EmailSubscription by `manage.py send_newsletters`"""
+    STATUS_CHOICES = [
+        ('draft', 'Draft'),
+        ('queued', 'Queued'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField(help_text="Markdown, rendered once per broadcast")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='draft')
+
+    # Resume checkpoint: every subscriber up to this id has been handled
+    last_subscriber_id = models.BigIntegerField(default=0, editable=False)
+    sent_count = models.PositiveIntegerField(default=0, editable=False)
+    failed_count = models.PositiveIntegerField(default=0, editable=False)
+    # Lease of the worker sending it: set when claimed, renewed with every checkpoint
+    claimed_at = models.DateTimeField(null=True, blank=True, editable=False)
+    heartbeat_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True, editable=False)
+    finished_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return self.subject
+
+
+
+class ImageIngest(models.Model):
+    """What normalizing an uploaded image saved, written by lib/image_ingest.py"""
+    name = models.CharField(max_length=500, help_text="Storage name of the stored file")
+    format = models.CharField(max_length=10)
+    original_size = models.PositiveBigIntegerField()
+    stored_size = models.PositiveBigIntegerField()
+    bytes_saved = models.BigIntegerField()
+    original_width = models.PositiveIntegerField()
+    original_height = models.PositiveIntegerField()
+    stored_width = models.PositiveIntegerField()
+    stored_height = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Image Ingest'
+        verbose_name_plural = 'Image Ingests'
+
+    def __str__(self):
+        return f"{self.name} (-{self.bytes_saved} bytes)"
+
+
+
+class StoredBlob(models.Model):
+    """A file in media storage and how many model fields point at it (see lib/content_storage.py)"""
+    name = models.CharField(max_length=500, unique=True)
+    size = models.PositiveBigIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0)
+    # Set when ref_count drops to zero; `manage.py sweep_media` deletes the file after a grace period
+    unreferenced_since = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Stored Blob'
+        verbose_name_plural = 'Stored Blobs'
+        indexes = [
+            models.Index(fields=['ref_count', 'unreferenced_since']),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} refs)"
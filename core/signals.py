@@ -0,0 +1,102 @@
+from django.apps import apps
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+
+from lib.content_storage import MEDIA_FIELDS, add_references, file_names, release_references
+from lib.image_variants import IMAGE_FIELDS, variants_stored
+from lib.page_cache import invalidate_pages
+
+
+def remember_files(sender, instance, raw=False, **kwargs):
+    """Remember the stored file names, to move references in post_save"""
+    instance._stored_files = set()
+    if raw or instance.pk is None:
+        return
+    fields = MEDIA_FIELDS[sender._meta.label]
+    stored = sender.objects.filter(pk=instance.pk).values_list(*fields).first()
+    instance._stored_files = {name for name in stored or () if name}
+
+
+def files_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    current = file_names(instance, MEDIA_FIELDS[sender._meta.label])
+    previous = getattr(instance, '_stored_files', set())
+    add_references(current - previous)
+    release_references(previous - current)
+
+
+def files_deleted(sender, instance, **kwargs):
+    """Replaces deleting files inline: the sweep removes them once nothing references them"""
+    release_references(file_names(instance, MEDIA_FIELDS[sender._meta.label]))
+
+
+def _taxonomy_tags(instance):
+    # Every post page listing the category/tag, read before a delete cascades the links away
+    return ['posts', 'categories', *(f'post:{pk}' for pk in instance.posts.values_list('pk', flat=True))]
+
+
+def _resume_tags(instance):
+    return ['resume']
+
+
+# Page cache tags (see lib/page_cache.py) of the pages showing a model: model label -> instance -> tags
+PAGE_TAGS = {
+    'blog.Post': lambda instance: ['posts', 'categories', f'post:{instance.pk}'],
+    'blog.Comment': lambda instance: [f'post:{instance.post_id}'],
+    'blog.Category': _taxonomy_tags,
+    'blog.Tag': _taxonomy_tags,
+    'projects.Project': lambda instance: ['projects', f'project:{instance.pk}'],
+    'projects.ProjectImage': lambda instance: ['projects', f'project:{instance.project_id}'],
+    'resume.Resume': _resume_tags,
+    'resume.Experience': _resume_tags,
+    'resume.Project': _resume_tags,
+    'resume.Education': _resume_tags,
+    'resume.Skill': _resume_tags,
+    'resume.Other': _resume_tags,
+}
+# Taxonomies are resolved before deletion, the rest after
+TAGS_BEFORE_DELETE = ('blog.Category', 'blog.Tag')
+
+
+def pages_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    invalidate_pages(*PAGE_TAGS[sender._meta.label](instance))
+
+
+def post_taxonomy_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'pre_remove', 'pre_clear'):
+        return
+    if not reverse:
+        invalidate_pages('posts', 'categories', f'post:{instance.pk}')
+    elif pk_set is not None:
+        invalidate_pages('posts', 'categories', *(f'post:{pk}' for pk in pk_set))
+    else:
+        invalidate_pages(*_taxonomy_tags(instance))
+
+
+def image_variants_stored(sender, pk, **kwargs):
+    instance = sender._default_manager.filter(pk=pk).first()
+    if instance is not None:
+        invalidate_pages(*PAGE_TAGS[sender._meta.label](instance))
+
+
+def connect():
+    for label in MEDIA_FIELDS:
+        model = apps.get_model(label)
+        pre_save.connect(remember_files, sender=model, dispatch_uid=f'media_refs_pre_save_{label}')
+        post_save.connect(files_saved, sender=model, dispatch_uid=f'media_refs_post_save_{label}')
+        post_delete.connect(files_deleted, sender=model, dispatch_uid=f'media_refs_post_delete_{label}')
+
+    for label in PAGE_TAGS:
+        model = apps.get_model(label)
+        deleted = pre_delete if label in TAGS_BEFORE_DELETE else post_delete
+        post_save.connect(pages_changed, sender=model, dispatch_uid=f'page_cache_post_save_{label}')
+        deleted.connect(pages_changed, sender=model, dispatch_uid=f'page_cache_delete_{label}')
+    for label, field_name in IMAGE_FIELDS:
+        variants_stored.connect(
+            image_variants_stored, sender=apps.get_model(label), dispatch_uid=f'page_cache_variants_{label}_{field_name}',
+        )
+    Post = apps.get_model('blog', 'Post')
+    for through in (Post.categories.through, Post.tags.through):
+        m2m_changed.connect(post_taxonomy_changed, sender=through, dispatch_uid=f'page_cache_m2m_{through._meta.label}')
@@ -0,0 +1,68 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html, format_html_join
+
+from lib.image_variants import FORMATS, get_variants
+
+register = template.Library()
+
+
+def _srcset(variants):
+    return ', '.join(f'{default_storage.url(name)} {width}w' for width, name in variants)
+
+
+@register.simple_tag
+def image_srcset(image, fmt='webp'):
+    """The srcset value for one format of an image field, empty while its variants are not built"""
+    record = get_variants(image)
+    if not record or not record.get(fmt):
+        return ''
+    return _srcset(record[fmt])
+
+
+@register.simple_tag
+def image_url(image, width=960):
+    """
+    URL of the smallest variant at least `width` pixels wide in the preferred
+    format (for CSS backgrounds, where srcset does not apply), or the original.
+    """
+    if not image:
+        return ''
+    record = get_variants(image)
+    if not record:
+        return image.url
+    variants = record[record['formats'][0]]
+    name = next((name for variant_width, name in variants if variant_width >= width), variants[-1][1])
+    return default_storage.url(name)
+
+
+@register.simple_tag
+def responsive_image(image, alt='', sizes='100vw', **attrs):
+    """
+    A <picture> with one srcset per variant format and an <img> fallback, or a
+    plain <img> of the original while the variants are missing. Extra keyword
+    arguments become attributes of the <img> (class, style, ...).
+    """
+    if not image:
+        return ''
+    attributes = format_html_join('', ' {}="{}"', ((key.replace('_', '-'), value) for key, value in attrs.items()))
+    record = get_variants(image)
+    if not record:
+        return format_html('<img src="{}" alt="{}" loading="lazy"{}>', image.url, alt, attributes)
+
+    *preferred, fallback = record['formats']
+    sources = format_html_join(
+        '', '<source type="{}" srcset="{}" sizes="{}">',
+        ((FORMATS[fmt][1], _srcset(record[fmt]), sizes) for fmt in preferred),
+    )
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" alt="{}" loading="lazy"{}></picture>',
+        sources,
+        default_storage.url(record[fallback][-1][1]),
+        _srcset(record[fallback]),
+        sizes,
+        record['width'],
+        record['height'],
+        alt,
+        attributes,
+    )
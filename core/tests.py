@@ -1,3 +1,549 @@
-from django.test import TestCase
+from django.contrib.auth.models import User
+from django.contrib.messages import constants as message_constants
+from django.contrib.messages.storage.base import Message
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core import mail
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import hashlib
+import io
+import json
+import os
+import re
+import requests
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
 
-# Create your tests here.
+from blog.models import Category, Post
+from core.models import GitHubActivitySnapshot, OutboxEmail, StoredBlob
+from lib import github_activity
+from lib.content_storage import sweep_unreferenced
+from lib.emails_hanlder import _claim_due_emails, deliver_outbox, queue_email
+from lib.github_client import GitHubClient
+from lib.page_cache import CSRF_PLACEHOLDER, PageCacheStats
+
+
+class GitHubStub(BaseHTTPRequestHandler):
+    """
+    Minimal GitHub API: /users/<user>/repos and /repos/<user>/<repo>/commits,
+    with ETags, 304s for matching If-None-Match and an optional delay.
+    """
+    server_version = 'GitHubStub'
+
+    def do_GET(self):
+        stub = self.server.stub
+        path = self.path.split('?', 1)[0]
+        with stub['lock']:
+            stub['requests'].append((path, self.headers.get('If-None-Match')))
+            stub['active'] += 1
+            stub['max_active'] = max(stub['max_active'], stub['active'])
+        try:
+            time.sleep(stub['delay'])
+            parts = path.strip('/').split('/')
+            if parts[0] == 'users':
+                body = [{'name': name} for name in stub['repos']]
+            else:
+                repo = parts[2]
+                body = [{'commit': {
+                    'author': {'name': 'Ada'},
+                    'committer': {'name': 'Ada', 'date': '2024-05-01T10:00:00Z'},
+                    'message': f'Work on {repo}',
+                }}]
+            payload = json.dumps(body).encode()
+            etag = f'"{hashlib.sha1(payload).hexdigest()}"'
+            if self.headers.get('If-None-Match') == etag:
+                with stub['lock']:
+                    stub['not_modified'] += 1
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            with stub['lock']:
+                stub['active'] -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+class GitHubStubMixin:
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), GitHubStub)
+        cls.server.daemon_threads = True
+        cls.base_url = f'http://127.0.0.1:{cls.server.server_address[1]}'
+        cls.server_thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.server_thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        self.stub = self.server.stub = {
+            'repos': ['alpha', 'beta', 'gamma'],
+            'delay': 0,
+            'requests': [],
+            'not_modified': 0,
+            'active': 0,
+            'max_active': 0,
+            'lock': threading.Lock(),
+        }
+
+    def make_client(self, **kwargs):
+        client = GitHubClient(base_url=self.base_url, **kwargs)
+        self.addCleanup(client.close)
+        return client
+
+
+class GitHubClientTests(GitHubStubMixin, TestCase):
+    def test_unchanged_resources_are_answered_from_the_etag_cache(self):
+        client = self.make_client()
+        etags = {}
+        first = client.fetch_activity('ada', etags)
+        self.assertEqual(len(etags), 4)
+        self.assertEqual(self.stub['not_modified'], 0)
+
+        second = client.fetch_activity('ada', etags)
+        self.assertEqual(second, first)
+        self.assertEqual(self.stub['not_modified'], 4)
+        conditional = [etag for _, etag in self.stub['requests'][4:]]
+        self.assertTrue(all(conditional))
+
+    def test_every_call_is_bounded_by_the_timeout(self):
+        self.stub['delay'] = 2
+        client = self.make_client(timeout=0.2)
+        started = time.monotonic()
+        with self.assertRaises(requests.Timeout):
+            client.get_json('/users/ada/repos', {})
+        self.assertLess(time.monotonic() - started, 1.5)
+
+    def test_commits_are_fetched_concurrently(self):
+        self.stub['delay'] = 0.3
+        client = self.make_client(max_workers=4)
+        started = time.monotonic()
+        data = client.fetch_activity('ada', {})
+        elapsed = time.monotonic() - started
+
+        self.assertEqual([list(repo) for repo in data], [['alpha'], ['beta'], ['gamma']])
+        self.assertEqual(data[0]['alpha'][0]['message'], 'Work on alpha')
+        self.assertGreaterEqual(self.stub['max_active'], 2)
+        # One round for the repository list and one for all commits, not one per repository
+        self.assertLess(elapsed, 0.3 * 3.5)
+
+    def test_etags_of_repositories_that_dropped_out_are_pruned(self):
+        client = self.make_client()
+        etags = {}
+        client.fetch_activity('ada', etags)
+        self.stub['repos'] = ['delta', 'alpha', 'beta']
+        client.fetch_activity('ada', etags)
+
+        self.assertEqual(len(etags), 4)
+        self.assertFalse(any('/repos/ada/gamma/' in url for url in etags))
+        self.assertTrue(any('/repos/ada/delta/' in url for url in etags))
+
+
+@override_settings(GITHUB_USERNAME='ada')
+class GitHubActivityRefreshTests(GitHubStubMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        github_activity._client = None
+        self.addCleanup(setattr, github_activity, '_client', None)
+
+    def test_refresh_stores_the_snapshot_and_revalidates_with_its_etags(self):
+        with self.settings(GITHUB_API_URL=self.base_url):
+            self.assertTrue(github_activity.refresh_github_activity())
+            self.assertTrue(github_activity.refresh_github_activity())
+
+        snapshot = GitHubActivitySnapshot.objects.get(username='ada')
+        self.assertEqual(len(snapshot.data), 3)
+        self.assertEqual(len(snapshot.etags), 4)
+        self.assertIsNone(snapshot.refresh_started_at)
+        self.assertEqual(self.stub['not_modified'], 4)
+        self.assertEqual(github_activity.get_github_activity()[0]['alpha'][0]['time'].year, 2024)
+
+    def test_failed_refresh_keeps_the_previous_snapshot(self):
+        GitHubActivitySnapshot.objects.create(username='ada', data=[{'old': []}])
+        self.stub['delay'] = 2
+        with self.settings(GITHUB_API_URL=self.base_url, GITHUB_REQUEST_TIMEOUT=0.2):
+            self.assertFalse(github_activity.refresh_github_activity())
+        self.assertEqual(GitHubActivitySnapshot.objects.get(username='ada').data, [{'old': []}])
+
+
+class FailingConnection:
+    """Mail connection whose every send fails, like an SMTP server that is down"""
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def send_messages(self, messages):
+        raise ConnectionRefusedError('SMTP server unavailable')
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    OUTBOX_MAX_ATTEMPTS=3,
+    OUTBOX_RETRY_BASE_DELAY=60,
+    OUTBOX_LEASE_SECONDS=300,
+    EMAIL_TIMEOUT=20,
+)
+class OutboxTests(TestCase):
+    def queue(self, to='reader@example.com'):
+        return queue_email(subject='Hello', body='<p>Hi</p>', to=to)
+
+    def make_due(self):
+        OutboxEmail.objects.update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+
+    def test_enqueue_is_rolled_back_with_its_transaction(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                self.queue()
+                raise RuntimeError('form save failed')
+        self.assertFalse(OutboxEmail.objects.exists())
+
+    def test_due_email_is_sent(self):
+        email = self.queue()
+        self.assertEqual(deliver_outbox(), (1, 0))
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['reader@example.com'])
+        self.assertEqual(mail.outbox[0].content_subtype, 'html')
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('sent', 1))
+        self.assertIsNotNone(email.sent_at)
+        self.assertEqual(deliver_outbox(), (0, 0))
+
+    def test_failures_are_retried_with_exponential_backoff(self):
+        email = self.queue()
+        before = timezone.now()
+        self.assertEqual(deliver_outbox(connection=FailingConnection()), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('pending', 1))
+        self.assertIn('SMTP server unavailable', email.last_error)
+        self.assertAlmostEqual((email.next_attempt_at - before).total_seconds(), 60, delta=5)
+
+        # Not due yet
+        self.assertEqual(deliver_outbox(connection=FailingConnection()), (0, 0))
+
+        self.make_due()
+        before = timezone.now()
+        deliver_outbox(connection=FailingConnection())
+        email.refresh_from_db()
+        self.assertEqual(email.attempts, 2)
+        self.assertAlmostEqual((email.next_attempt_at - before).total_seconds(), 120, delta=5)
+
+        self.make_due()
+        self.assertEqual(deliver_outbox(), (1, 0))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts, email.last_error), ('sent', 3, ''))
+
+    def test_email_fails_for_good_after_max_attempts(self):
+        email = self.queue()
+        for _ in range(3):
+            self.make_due()
+            deliver_outbox(connection=FailingConnection())
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('failed', 3))
+
+        self.make_due()
+        self.assertEqual(deliver_outbox(), (0, 0))
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_claimed_batch_is_leased_until_it_expires(self):
+        first, second = self.queue(), self.queue('other@example.com')
+        before = timezone.now()
+        self.assertEqual({email.pk for email in _claim_due_emails(10)}, {first.pk, second.pk})
+        # Another worker sees nothing while the lease runs
+        self.assertEqual(_claim_due_emails(10), [])
+        first.refresh_from_db()
+        self.assertAlmostEqual((first.next_attempt_at - before).total_seconds(), 300, delta=5)
+
+        # A worker that died mid-batch: its emails come back once the lease is over
+        self.make_due()
+        self.assertEqual(len(_claim_due_emails(10)), 2)
+
+    @override_settings(OUTBOX_LEASE_SECONDS=30)
+    def test_emails_left_when_the_lease_runs_out_are_handed_back(self):
+        emails = [self.queue(f'reader{index}@example.com') for index in range(3)]
+        # Lease minus two email timeouts is already in the past: only the first email goes out
+        self.assertEqual(deliver_outbox(), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        statuses = list(OutboxEmail.objects.order_by('pk').values_list('status', flat=True))
+        self.assertEqual(statuses, ['sent', 'pending', 'pending'])
+
+        self.assertEqual(deliver_outbox(), (1, 0))
+        self.assertEqual(mail.outbox[1].to, [emails[1].to])
+
+
+def png_bytes(color):
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new('RGB', (16, 16), color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+class ContentStorageTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        overrides = self.settings(MEDIA_ROOT=media_root, IMAGE_VARIANT_WORKERS=0)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.author = User.objects.create_user('writer')
+        self.assertEqual(default_storage.location, media_root)
+
+    def create_post(self, title, image):
+        post = Post(title=title, content='Body', author=self.author, status='draft')
+        post.featured_image = SimpleUploadedFile(f'{title}.png', image)
+        with self.captureOnCommitCallbacks(execute=True):
+            post.save()
+        return post
+
+    def blob(self, name):
+        return StoredBlob.objects.get(name=name)
+
+    def backdate(self, name, **delta):
+        StoredBlob.objects.filter(name=name).update(unreferenced_since=timezone.now() - timedelta(**delta))
+
+    def test_identical_uploads_share_one_file_with_two_references(self):
+        image = png_bytes('red')
+        first = self.create_post('first', image)
+        second = self.create_post('second', image)
+
+        name = first.featured_image.name
+        self.assertEqual(second.featured_image.name, name)
+        self.assertTrue(name.startswith('cas/'))
+        self.assertEqual(self.blob(name).ref_count, 2)
+        self.assertEqual(os.listdir(os.path.dirname(default_storage.path(name))), [os.path.basename(name)])
+
+    def test_replaced_file_is_released_only_after_commit(self):
+        post = self.create_post('replaced', png_bytes('red'))
+        old_name = post.featured_image.name
+
+        post.featured_image = SimpleUploadedFile('new.png', png_bytes('blue'))
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            post.save()
+            self.assertEqual(self.blob(old_name).ref_count, 1)
+        self.assertEqual(self.blob(post.featured_image.name).ref_count, 1)
+        self.assertEqual(self.blob(old_name).ref_count, 1)
+
+        for callback in callbacks:
+            callback()
+        blob = self.blob(old_name)
+        self.assertEqual(blob.ref_count, 0)
+        self.assertIsNotNone(blob.unreferenced_since)
+        self.assertTrue(default_storage.exists(old_name))
+
+    def test_deleted_row_releases_its_file_only_after_commit(self):
+        post = self.create_post('deleted', png_bytes('green'))
+        name = post.featured_image.name
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            post.delete()
+        self.assertEqual(self.blob(name).ref_count, 1)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.blob(name).ref_count, 0)
+
+    def test_sweep_waits_for_the_grace_period(self):
+        post = self.create_post('swept', png_bytes('yellow'))
+        name = post.featured_image.name
+        with self.captureOnCommitCallbacks(execute=True):
+            post.delete()
+
+        self.assertEqual(sweep_unreferenced(timedelta(hours=1)), (0, 0))
+        self.assertTrue(default_storage.exists(name))
+
+        self.backdate(name, hours=2)
+        removed, freed = sweep_unreferenced(timedelta(hours=1))
+        self.assertEqual(removed, 1)
+        self.assertGreater(freed, 0)
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(StoredBlob.objects.filter(name=name).exists())
+
+    def test_sweep_keeps_referenced_blobs(self):
+        post = self.create_post('kept', png_bytes('purple'))
+        StoredBlob.objects.filter(name=post.featured_image.name).update(created_at=timezone.now() - timedelta(days=3))
+        self.assertEqual(sweep_unreferenced(timedelta(seconds=0)), (0, 0))
+        self.assertTrue(default_storage.exists(post.featured_image.name))
+
+    def test_reupload_of_an_unreferenced_blob_restarts_its_grace_period(self):
+        image = png_bytes('orange')
+        post = self.create_post('orphaned', image)
+        name = post.featured_image.name
+        with self.captureOnCommitCallbacks(execute=True):
+            post.delete()
+        self.backdate(name, days=2)
+
+        # Same bytes stored again, before the row referencing them is saved
+        self.assertEqual(default_storage.save('blog/again.png', ContentFile(image)), name)
+        self.assertGreater(self.blob(name).unreferenced_since, timezone.now() - timedelta(minutes=1))
+        self.assertEqual(sweep_unreferenced(timedelta(days=1)), (0, 0))
+        self.assertTrue(default_storage.exists(name))
+
+    def test_reupload_restores_a_file_the_sweep_already_removed(self):
+        image = png_bytes('pink')
+        name = default_storage.save('blog/restored.png', ContentFile(image))
+        os.remove(default_storage.path(name))
+
+        self.assertEqual(default_storage.save('blog/restored.png', ContentFile(image)), name)
+        self.assertTrue(default_storage.exists(name))
+        self.assertEqual(StoredBlob.objects.filter(name=name).count(), 1)
+
+
+CSRF_INPUT = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+
+@override_settings(
+    PAGE_CACHE_ENABLED=True,
+    CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'page-cache-tests-default'},
+        'pages': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'page-cache-tests-pages'},
+    },
+)
+class PageCacheTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user('author', password='secret')
+        self.category = Category.objects.create(name='Caching')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post = Post.objects.create(
+                title='Cached post', content='Body', author=self.author, status='published', published_at=timezone.now(),
+            )
+        self.url = f'/blog/{self.post.slug}/'
+
+    def get(self, url, client=None):
+        return (client or self.client).get(url).get('X-Page-Cache')
+
+    def test_anonymous_get_is_served_from_the_cache(self):
+        self.assertEqual(self.get(self.url), 'miss')
+        response = self.client.get(self.url)
+        self.assertEqual(response.get('X-Page-Cache'), 'hit')
+        self.assertContains(response, 'Cached post')
+        # Tracking parameters share the entry, other parameters do not
+        self.assertEqual(self.get(self.url + '?utm_source=feed'), 'hit')
+        self.assertEqual(self.get(self.url + '?comments_after=x'), 'miss')
+
+    def test_saving_a_post_invalidates_its_pages(self):
+        self.get(self.url)
+        self.get('/blog/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.title = 'Renamed post'
+            self.post.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response.get('X-Page-Cache'), 'miss')
+        self.assertContains(response, 'Renamed post')
+        self.assertEqual(self.get('/blog/'), 'miss')
+
+    def test_invalidation_waits_for_the_commit(self):
+        self.get(self.url)
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.post.save()
+        self.assertEqual(self.get(self.url), 'hit')
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.get(self.url), 'miss')
+
+    def test_category_changes_invalidate_post_pages(self):
+        self.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.categories.add(self.category)
+        self.assertEqual(self.get(self.url), 'miss')
+        self.assertEqual(self.get(self.url), 'hit')
+
+        # From the category side, with the post in pk_set
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.posts.remove(self.post)
+        self.assertEqual(self.get(self.url), 'miss')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.categories.add(self.category)
+        self.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.name = 'Renamed'
+            self.category.save()
+        self.assertEqual(self.get(self.url), 'miss')
+
+    def test_unrelated_posts_keep_their_pages(self):
+        self.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(title='Other post', content='Body', author=self.author, status='draft')
+        self.assertEqual(self.get(self.url), 'hit')
+
+    def test_signed_in_users_bypass_the_cache(self):
+        self.get(self.url)
+        self.client.force_login(self.author)
+        self.assertEqual(self.get(self.url), 'bypass')
+        self.assertEqual(self.get(self.url), 'bypass')
+
+    def test_posts_bypass_the_cache(self):
+        self.get('/blog/')
+        response = self.client.post('/blog/', {'email': 'not-an-email'})
+        self.assertEqual(response.get('X-Page-Cache'), 'bypass')
+
+    def test_pending_messages_bypass_the_cache(self):
+        self.get(self.url)
+        storage = CookieStorage(RequestFactory().get('/'))
+        self.client.cookies['messages'] = storage._encode([Message(message_constants.SUCCESS, 'Subscribed')])
+        response = self.client.get(self.url)
+        self.assertEqual(response.get('X-Page-Cache'), 'bypass')
+        self.assertContains(response, 'Subscribed')
+
+    def test_hits_carry_the_visitors_own_csrf_token(self):
+        first = Client(enforce_csrf_checks=True)
+        second = Client(enforce_csrf_checks=True)
+        self.assertEqual(self.get('/blog/', first), 'miss')
+        response = second.get('/blog/')
+        self.assertEqual(response.get('X-Page-Cache'), 'hit')
+
+        content = response.content.decode()
+        self.assertNotIn(CSRF_PLACEHOLDER.decode(), content)
+        token = CSRF_INPUT.search(content).group(1)
+        self.assertNotEqual(token, CSRF_INPUT.search(first.get('/blog/').content.decode()).group(1))
+        self.assertIn('csrftoken', response.cookies)
+
+        # The substituted token is accepted with the cookie set alongside it
+        response = second.post('/blog/', {'csrfmiddlewaretoken': token, 'email': 'not-an-email'})
+        self.assertNotEqual(response.status_code, 403)
+
+    def test_hits_still_count_post_views(self):
+        from lib.view_counter import get_post_view_counter
+
+        with mock.patch.object(get_post_view_counter(), 'record') as record:
+            self.assertEqual(self.get(self.url), 'miss')
+            self.assertEqual(self.get(self.url), 'hit')
+        self.assertEqual(record.call_args_list, [mock.call(self.post.pk)] * 2)
+
+    def test_stats_reach_the_shared_cache_when_flushed(self):
+        # Counts flushed by the requests of other tests share the cache
+        PageCacheStats.reset()
+        stats = PageCacheStats(flush_interval=3600, flush_size=1000)
+        for outcome in ('hit', 'hit', 'miss', 'bypass'):
+            stats.record(outcome)
+        self.assertEqual(PageCacheStats.totals(), {'hit': 0, 'miss': 0, 'bypass': 0})
+        stats.flush()
+        self.assertEqual(PageCacheStats.totals(), {'hit': 2, 'miss': 1, 'bypass': 1})
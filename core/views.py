@@ -1,16 +1,17 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
+from django.db import transaction
 from django.http import Http404
 from .forms import ContactForm
 from .models import EmailSubscription
 from projects.models import Project
-from resume.models import Resume
 from lib.emails_hanlder import email_contact_confirmation
 from lib.subscribe_newsletter import subscribe_newsletter
-import requests 
-import os
-import json
-from datetime import datetime
+from lib.github_activity import get_github_activity
+from lib.page_cache import add_page_tags
+import logging
+
+logger = logging.getLogger(__name__)
     
 
 # Create your views here.
@@ -20,46 +21,14 @@ def base(request):
 def index(request):
     form = subscribe_newsletter(request)
     
-    projects = Project.objects.all().order_by('-created_at')[:3]
-    resume = Resume.objects.first()
-
-
-    # GITHUB ACTIVITY
-    GITHUB_BASE_URL = 'https://api.github.com'
-    user_name = 'rougho'
-    repository_url = f"{GITHUB_BASE_URL}/users/{user_name}/repos?sort=created&direction=desc"
-    personal_access_token = os.getenv('GITHUB_TOKEN')
-    headers = {
-        'Authorization': f"Bearer {personal_access_token}" }
-    repo_response = requests.get(repository_url, headers=headers)
-    if repo_response.status_code == 200:
-        data = []
-        repositories = repo_response.json()[:3]
-        for repo in repositories:
-            repo_dict = {}
-            name = repo.get('name')
-            url = f'https://api.github.com/repos/rougho/{name}/commits'
-            commits = requests.get(url, headers=headers).json()[:3]
-            commit_list = []
-            for commit in commits:
-                commit_data = {
-                    'author': commit.get('commit', {}).get('author', {}).get('name', ''),
-                    'committer': commit.get('commit', {}).get('committer', {}).get('name', ''),
-                    'message': commit.get('commit', {}).get('message', ''),
-                    'time': datetime.strptime(
-                        commit.get('commit', {}).get('committer', {}).get('date', ''),
-                        "%Y-%m-%dT%H:%M:%SZ"
-                    )
-                }
-                commit_list.append(commit_data)
-            repo_dict[name] = commit_list
-            data.append(repo_dict)
+    projects = Project.objects.with_featured_image().order_by('-created_at')[:3]
 
+    # GITHUB ACTIVITY (served from the stored snapshot, refreshed in the background)
+    github_activity = get_github_activity()
 
-
-        
-    ####################
-    return render(request, 'core/index.html', {'form': form, 'projects': projects, 'resume': resume, 'github_activity': data if 'data' in locals() else []})
+    # Anonymous visitors get the rendered page from the page cache until one of these changes
+    add_page_tags(request, 'projects', 'github')
+    return render(request, 'core/index.html', {'form': form, 'projects': projects, 'github_activity': github_activity})
 
 
 
@@ -67,19 +36,23 @@ def contact(request):
     if request.method == 'POST':
         form = ContactForm(request.POST)
         if form.is_valid():
-            # Save the form first to get the ID
-            contact_instance = form.save()
-            
-            # Now get the data including the auto-generated ID
-            email = form.cleaned_data['email']
-            full_name = contact_instance.full_name  # Use the property from the model
-            contact_id = contact_instance.id
-            
-            if email_contact_confirmation(request, id=contact_id, email=email, full_name=full_name):
+            # Save the message and queue the confirmation email together: both or neither
+            try:
+                with transaction.atomic():
+                    contact_instance = form.save()
+                    
+                    # Now get the data including the auto-generated ID
+                    email = form.cleaned_data['email']
+                    full_name = contact_instance.full_name  # Use the property from the model
+                    contact_id = contact_instance.id
+                    
+                    email_contact_confirmation(request, id=contact_id, email=email, full_name=full_name)
+            except Exception as e:
+                logger.error(f"Failed to save contact message from {form.cleaned_data.get('email')}: {str(e)}")
+                messages.error(request, 'Something happened. Please contact via email address after 48 hours.')
+            else:
                 messages.success(request, 'Thank you for contacting me! I will get back to you soon.')
                 return redirect('homepage')  # Redirect to avoid form resubmission
-            else:
-                messages.error(request, 'Something happened. Please contact via email address after 48 hours.')
 
         else:
             # Handle specific field errors
@@ -104,8 +77,7 @@ def contact(request):
     else:
         form = ContactForm()
     
-    resume = Resume.objects.first()
-    return render(request, 'core/contact.html', {'form': form, 'resume': resume})
+    return render(request, 'core/contact.html', {'form': form})
 
 
 def unsubscribe(request, uuid):
@@ -0,0 +1,69 @@
+from django.conf import settings
+from django.db.models import Q
+
+from blog.models import Comment
+
+
+class CommentPage:
+    """A page of top-level threads, each root carrying its nested replies in `children`"""
+
+    def __init__(self, threads, next_cursor=None):
+        self.threads = threads
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.threads)
+
+    def __len__(self):
+        return len(self.threads)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def build_tree(post, comments):
+    """
+    Nest comments ordered by path under their parents, in Python. A reply
+    whose parent was not loaded (inactive or hidden) is dropped together with
+    its own replies, like get_replies() would. Returns the roots.
+    """
+    nodes = {}
+    roots = []
+    for comment in comments:
+        # Every comment belongs to `post`, so __str__ and templates never query for it
+        comment.post = post
+        comment.children = []
+        if comment.parent_id is None:
+            roots.append(comment)
+        elif comment.parent_id in nodes:
+            nodes[comment.parent_id].children.append(comment)
+        else:
+            continue
+        nodes[comment.pk] = comment
+    return roots
+
+
+def load_comment_threads(post, after=None, limit=None):
+    """
+    One page of top-level threads with all their replies, in two queries: the
+    root paths of the page, then a single read of every comment under them.
+    `after` is the cursor (last root path) of the previous page.
+    """
+    limit = limit or settings.COMMENT_THREADS_PER_PAGE
+    roots = Comment.objects.filter(post=post, active=True, parent__isnull=True)
+    if after:
+        roots = roots.filter(path__gt=after)
+    root_paths = list(roots.order_by('path').values_list('path', flat=True)[:limit + 1])
+    has_more = len(root_paths) > limit
+    root_paths = root_paths[:limit]
+    if not root_paths:
+        return CommentPage([])
+
+    # Prefix matches and a Python sort: a path range would depend on '/' sorting before '0',
+    # which only holds under bytewise collations
+    under_roots = Q()
+    for path in root_paths:
+        under_roots |= Q(path__startswith=path)
+    comments = Comment.objects.filter(under_roots, post=post, active=True).select_related('author')
+    comments = sorted(comments, key=lambda comment: comment.path)
+    return CommentPage(build_tree(post, comments), next_cursor=root_paths[-1] if has_more else None)
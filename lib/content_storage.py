@@ -0,0 +1,203 @@
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+import hashlib
+import logging
+import os
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+# Model file fields whose values are reference counted: model label -> field names
+MEDIA_FIELDS = {
+    'blog.Post': ('featured_image',),
+    'projects.ProjectImage': ('image',),
+    'resume.Resume': ('image', 'pdf_resume'),
+}
+
+CONTENT_PREFIX = 'cas'
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stores every file under the SHA-256 of its content,
+    cas/<ab>/<cd>/<digest><ext>, whatever name upload_to asked for. Saving
+    the same bytes twice returns the existing name and writes nothing.
+
+    Files are never deleted on the request path: model fields hold
+    references to core.StoredBlob rows, and `manage.py sweep_media`
+    removes blobs that stayed unreferenced.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # The final name comes from the content in _save, collisions are the same file
+        return name
+
+    def _save(self, name, content):
+        extension = os.path.splitext(name)[1].lower()
+        staging = os.path.join(self.location, CONTENT_PREFIX, 'tmp')
+        os.makedirs(staging, exist_ok=True)
+
+        # Hashed while it is copied, so the upload is read once and never held in memory
+        digest = hashlib.sha256()
+        size = 0
+        fd, temporary = tempfile.mkstemp(dir=staging)
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    out.write(chunk)
+                    size += len(chunk)
+            digest = digest.hexdigest()
+            name = f'{CONTENT_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+            path = self.path(name)
+            with transaction.atomic():
+                # The blob row is locked first, so the sweep cannot delete the file between the check and the reuse
+                register_blob(name, size)
+                if os.path.exists(path):
+                    os.remove(temporary)
+                else:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    if self.file_permissions_mode is not None:
+                        os.chmod(temporary, self.file_permissions_mode)
+                    os.replace(temporary, path)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+        return name
+
+
+def _blob_model():
+    return apps.get_model('core', 'StoredBlob')
+
+
+def register_blob(name, size):
+    """
+    Record a stored file and lock its row until the surrounding transaction
+    ends. An unreferenced blob restarts its grace period, so the sweep
+    cannot remove it before the row that is about to reference it has been
+    saved.
+    """
+    StoredBlob = _blob_model()
+    blob = StoredBlob.objects.select_for_update().filter(name=name).first()
+    if blob is None:
+        try:
+            with transaction.atomic():
+                StoredBlob.objects.create(name=name, size=size, unreferenced_since=timezone.now())
+            return
+        except IntegrityError:
+            # Created concurrently
+            blob = StoredBlob.objects.select_for_update().get(name=name)
+    if blob.ref_count == 0:
+        StoredBlob.objects.filter(pk=blob.pk).update(unreferenced_since=timezone.now())
+
+
+def file_names(instance, fields):
+    return {getattr(instance, field).name for field in fields if getattr(instance, field)}
+
+
+def add_references(names):
+    """Count a reference to each stored name, in the current transaction"""
+    StoredBlob = _blob_model()
+    for name in names:
+        updated = StoredBlob.objects.filter(name=name).update(ref_count=F('ref_count') + 1, unreferenced_since=None)
+        if not updated:
+            # Files stored before reference counting (or by another storage)
+            size = default_storage.size(name) if default_storage.exists(name) else 0
+            try:
+                with transaction.atomic():
+                    StoredBlob.objects.create(name=name, size=size, ref_count=1)
+            except IntegrityError:
+                StoredBlob.objects.filter(name=name).update(ref_count=F('ref_count') + 1, unreferenced_since=None)
+
+
+def release_references(names):
+    """
+    Drop a reference to each stored name once the transaction commits. The
+    files stay on disk; a blob reaching zero is timestamped for the sweep.
+    """
+    names = list(names)
+    if not names:
+        return
+
+    def release():
+        _blob_model().objects.filter(name__in=names).update(
+            unreferenced_since=Case(
+                When(ref_count__lte=1, then=Value(timezone.now())),
+                default=F('unreferenced_since'),
+            ),
+            ref_count=Greatest(F('ref_count') - 1, 0),
+        )
+
+    transaction.on_commit(release)
+
+
+def sweep_unreferenced(grace, batch_size=500):
+    """
+    Delete the files of blobs unreferenced for longer than `grace` (a
+    timedelta) and their rows. Each row is re-checked under a lock, so a
+    blob referenced again meanwhile is kept. Returns (files, bytes) removed.
+    """
+    StoredBlob = _blob_model()
+    cutoff = timezone.now() - grace
+    removed = freed = 0
+    last_pk = 0
+    while True:
+        candidates = list(
+            StoredBlob.objects.filter(pk__gt=last_pk, ref_count=0, unreferenced_since__lt=cutoff)
+            .order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not candidates:
+            break
+        last_pk = candidates[-1]
+        for pk in candidates:
+            with transaction.atomic():
+                blob = StoredBlob.objects.select_for_update().filter(
+                    pk=pk, ref_count=0, unreferenced_since__lt=cutoff,
+                ).first()
+                if blob is None:
+                    continue
+                default_storage.delete(blob.name)
+                blob.delete()
+            removed += 1
+            freed += blob.size
+    logger.info(f"Media sweep removed {removed} files ({freed} bytes)")
+    return removed, freed
+
+
+def rebuild_references():
+    """
+    Recount every reference from the model fields, e.g. after enabling
+    reference counting on existing uploads or restoring a backup. Returns
+    the number of referenced names.
+    """
+    counts = {}
+    for label, fields in MEDIA_FIELDS.items():
+        for row in apps.get_model(label).objects.values_list(*fields):
+            for name in row:
+                if name:
+                    counts[name] = counts.get(name, 0) + 1
+
+    StoredBlob = _blob_model()
+    now = timezone.now()
+    with transaction.atomic():
+        StoredBlob.objects.exclude(name__in=list(counts)).filter(ref_count__gt=0).update(
+            ref_count=0, unreferenced_since=now,
+        )
+        existing = StoredBlob.objects.in_bulk(list(counts), field_name='name')
+        changed = []
+        for name, count in counts.items():
+            blob = existing.get(name)
+            if blob is None:
+                size = default_storage.size(name) if default_storage.exists(name) else 0
+                StoredBlob.objects.create(name=name, size=size, ref_count=count)
+            elif blob.ref_count != count:
+                blob.ref_count = count
+                blob.unreferenced_since = None
+                changed.append(blob)
+        StoredBlob.objects.bulk_update(changed, ['ref_count', 'unreferenced_since'], batch_size=500)
+    return len(counts)
@@ -1,63 +1,151 @@
-from django.core.mail import EmailMessage
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
 from django.template.loader import render_to_string
 from django.urls import reverse
+from django.utils import timezone
+from datetime import timedelta
 import logging
+import time
+
+from core.models import OutboxEmail
 
 logger = logging.getLogger(__name__)
 
+
+def queue_email(subject, body, to, content_subtype='html'):
+    """
+    Store an email in the outbox instead of talking to SMTP inside the request.
+    Called inside the caller's transaction, so the email only exists if the
+    rest of the request's writes are committed too.
+    """
+    return OutboxEmail.objects.create(
+        subject=subject,
+        body=body,
+        to=to,
+        content_subtype=content_subtype,
+    )
+
+# The two helpers below run inside the caller's transaction and let errors propagate:
+# a failed enqueue has to roll back the subscription/contact row and reach the view.
 def email_new_subscribers(request, subscription_instance):
-    try:
-        # Build the correct unsubscribe URL
-        unsubscribe_path = reverse('unsubscribe', kwargs={'uuid': subscription_instance.uuid})
-        unsubscribe_url = request.build_absolute_uri(unsubscribe_path)
-        
-        template = render_to_string(
-                'emails/subscriptions.html',
-                { 
-                    'receiver': subscription_instance.email.split('@')[0],
-                    'uuid': subscription_instance.uuid,
-                    'unsubscribe_url': unsubscribe_url,
-                    'request': request
-                }
-            )
-        
-        email = EmailMessage(
-            subject="🚀 You're In! Welcome aboard!",
-            body=template,
-            to=[subscription_instance.email]
+    # Build the correct unsubscribe URL
+    unsubscribe_path = reverse('unsubscribe', kwargs={'uuid': subscription_instance.uuid})
+    unsubscribe_url = request.build_absolute_uri(unsubscribe_path)
+    
+    template = render_to_string(
+            'emails/subscriptions.html',
+            { 
+                'receiver': subscription_instance.email.split('@')[0],
+                'uuid': subscription_instance.uuid,
+                'unsubscribe_url': unsubscribe_url,
+                'request': request
+            }
         )
-
-        email.content_subtype = 'html'
-        email.send()
-        logger.info(f"Subscription email sent successfully to {subscription_instance.email}")
-        return True
-        
-    except Exception as e:
-        logger.error(f"Failed to send subscription email to {subscription_instance.email}: {str(e)}")
-        return False
+    
+    queue_email(
+        subject="🚀 You're In! Welcome aboard!",
+        body=template,
+        to=subscription_instance.email
+    )
+    logger.info(f"Subscription email queued for {subscription_instance.email}")
 
 
 def email_contact_confirmation(request, id,email, full_name):
-    try:
-        template = render_to_string(
-                'emails/contact_confirmation.html',
-                { 
-                    'full_name' : full_name,
-                    'id' : id,
-                }
-            )
-        
-        email = EmailMessage(
-            subject='📧 Message Received. Thanks for reaching out!',
-            body=template,
-            to=[email]
+    template = render_to_string(
+            'emails/contact_confirmation.html',
+            { 
+                'full_name' : full_name,
+                'id' : id,
+            }
+        )
+    
+    queue_email(
+        subject='📧 Message Received. Thanks for reaching out!',
+        body=template,
+        to=email
+    )
+    logger.info(f"Contact form response email queued for {email}")
+
+
+def _claim_due_emails(batch_size):
+    """
+    Lease a batch of due emails by pushing next_attempt_at forward. If the worker
+    dies mid-batch the lease runs out and the emails are picked up again.
+    """
+    now = timezone.now()
+    lease_until = now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)
+    with transaction.atomic():
+        due = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        if due:
+            OutboxEmail.objects.filter(pk__in=[email.pk for email in due]).update(next_attempt_at=lease_until)
+    return due
+
+
+def deliver_outbox(connection=None, batch_size=50):
+    """
+    Send one batch of due outbox emails over a single (reused) connection.
+    Failures are retried with exponential backoff until OUTBOX_MAX_ATTEMPTS.
+    Emails still unsent when the lease is about to run out are handed back,
+    so a slow SMTP server never lets another worker send them a second time.
+    Returns (sent, failed) counts.
+    """
+    due = _claim_due_emails(batch_size)
+    if not due:
+        return 0, 0
+
+    if connection is None:
+        connection = get_connection()
+
+    # Leave room for one more send that hits EMAIL_TIMEOUT on connect and on data
+    deadline = time.monotonic() + settings.OUTBOX_LEASE_SECONDS - 2 * settings.EMAIL_TIMEOUT
+    sent = failed = 0
+    for index, outbox_email in enumerate(due):
+        if index and time.monotonic() > deadline:
+            remaining = [email.pk for email in due[index:]]
+            OutboxEmail.objects.filter(pk__in=remaining, status='pending').update(next_attempt_at=timezone.now())
+            logger.warning(f"Outbox lease running out, {len(remaining)} emails handed back")
+            break
+        message = EmailMessage(
+            subject=outbox_email.subject,
+            body=outbox_email.body,
+            to=[outbox_email.to],
+            connection=connection,
         )
+        message.content_subtype = outbox_email.content_subtype
+        try:
+            # No-op while the connection is up; reconnects after a failure closed it
+            connection.open()
+            message.send()
+        except Exception as e:
+            failed += 1
+            attempts = outbox_email.attempts + 1
+            if attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                status, next_attempt_at = 'failed', timezone.now()
+            else:
+                delay = settings.OUTBOX_RETRY_BASE_DELAY * (2 ** (attempts - 1))
+                status, next_attempt_at = 'pending', timezone.now() + timedelta(seconds=delay)
+            OutboxEmail.objects.filter(pk=outbox_email.pk).update(
+                status=status,
+                attempts=attempts,
+                next_attempt_at=next_attempt_at,
+                last_error=str(e),
+            )
+            logger.error(f"Failed to send outbox email {outbox_email.pk} to {outbox_email.to}: {str(e)}")
+            # The connection may be broken, the next message reconnects
+            connection.close()
+            continue
 
-        email.content_subtype = 'html'
-        email.send()
-        logger.info(f"Contact form response email sent successfully to {email}")
-        return True
-        
-    except Exception as e:
-        logger.error(f"Failed to send Contact form response email to {email}: {str(e)}")
-        return False
+        sent += 1
+        OutboxEmail.objects.filter(pk=outbox_email.pk).update(
+            status='sent',
+            attempts=outbox_email.attempts + 1,
+            sent_at=timezone.now(),
+            last_error='',
+        )
+        logger.info(f"Outbox email {outbox_email.pk} sent to {outbox_email.to}")
+    return sent, failed
@@ -0,0 +1,69 @@
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from blog.models import Comment, Post
+
+# name -> (model, through table, foreign key on the through table, counter column or None)
+RELATIONS = {
+    'post_like': (Post, Post.liked_by.through, 'post', 'likes_count'),
+    'post_bookmark': (Post, Post.bookmarked_by.through, 'post', None),
+    'comment_like': (Comment, Comment.liked_by.through, 'comment', 'likes_count'),
+}
+
+
+def set_engagement(relation, pk, user, on):
+    """
+    Idempotently add (`on`) or remove the `relation` link between a user and a
+    post or comment, and bring its counter in line, in one transaction.
+
+    The target row is locked first, so concurrent double-clicks are serialized
+    per post/comment; the link is written with an insert-or-ignore on the
+    through table, and the counter is recounted from it rather than moved by
+    a delta, so repeating a request never changes the result. This goes
+    around the m2m_changed handlers, which would count the same link twice
+    under a race. Returns the current counter (None for bookmarks).
+    """
+    model, through, field, counter = RELATIONS[relation]
+    link = {f'{field}_id': pk, 'user_id': user.pk}
+    with transaction.atomic():
+        model.objects.select_for_update().filter(pk=pk).only('pk').first()
+        if on:
+            through.objects.bulk_create([through(**link)], ignore_conflicts=True)
+        else:
+            through.objects.filter(**link).delete()
+        if counter is None:
+            return None
+        links = through.objects.filter(**{field: OuterRef('pk')}).values(field).annotate(total=Count('pk')).values('total')
+        model.objects.filter(pk=pk).update(**{counter: Coalesce(Subquery(links), 0)})
+        return model.objects.filter(pk=pk).values_list(counter, flat=True).first()
+
+
+def engagement_state(user, post_ids=(), comment_ids=()):
+    """
+    Per-user like/bookmark state and like counts for a batch of posts and
+    comments, in a fixed number of queries whatever the batch size.
+    """
+    post_ids = list(post_ids)
+    comment_ids = list(comment_ids)
+    posts = {
+        pk: {'liked': False, 'bookmarked': False, 'likes_count': likes_count}
+        for pk, likes_count in Post.objects.filter(pk__in=post_ids, status='published').values_list('pk', 'likes_count')
+    }
+    comments = {
+        pk: {'liked': False, 'likes_count': likes_count}
+        for pk, likes_count in Comment.objects.filter(pk__in=comment_ids, active=True).values_list('pk', 'likes_count')
+    }
+    if user.is_authenticated:
+        user_links = [
+            (posts, 'liked', Post.liked_by.through, 'post'),
+            (posts, 'bookmarked', Post.bookmarked_by.through, 'post'),
+            (comments, 'liked', Comment.liked_by.through, 'comment'),
+        ]
+        for states, key, through, field in user_links:
+            if not states:
+                continue
+            linked = through.objects.filter(user=user, **{f'{field}_id__in': list(states)}).values_list(f'{field}_id', flat=True)
+            for pk in linked:
+                states[pk][key] = True
+    return {'posts': posts, 'comments': comments}
@@ -0,0 +1,148 @@
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+import mimetypes
+import os
+import re
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _file_etag(stat):
+    return f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+
+
+def _parse_range(header, size):
+    """
+    Parse a single `bytes=start-end` range. Returns (start, end) inclusive,
+    None when the header should be ignored, or False when it is unsatisfiable.
+    Multi-range requests are answered with the full file.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        # Suffix range: the last N bytes
+        length = int(end)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = int(end) if end else size - 1
+    if start >= size or end < start:
+        return False
+    return start, min(end, size - 1)
+
+
+def _if_range_matches(request, etag, mtime):
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == int(mtime)
+
+
+def _iter_file_range(path, start, length, chunk_size):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _offload_response(path, content_type):
+    """Let the front proxy send the file, or return None if offloading does not apply"""
+    mode = settings.FILE_DELIVERY_OFFLOAD
+    if mode == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = path
+        return response
+    if mode == 'x-accel-redirect':
+        media_root = os.path.realpath(settings.MEDIA_ROOT)
+        real_path = os.path.realpath(path)
+        if os.path.commonpath([media_root, real_path]) != media_root:
+            return None
+        relative = os.path.relpath(real_path, media_root).replace(os.sep, '/')
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.FILE_DELIVERY_ACCEL_PREFIX.rstrip('/') + '/' + relative
+        return response
+    return None
+
+
+def serve_file(request, path, content_type=None, as_attachment=False, filename=None, max_age=None):
+    """
+    Deliver a file from disk without loading it into memory.
+
+    Answers conditional requests (If-None-Match / If-Modified-Since) with 304,
+    single byte ranges with 206, and streams everything else in chunks. When
+    FILE_DELIVERY_OFFLOAD is set the proxy sends the body instead
+    (X-Accel-Redirect for nginx, X-Sendfile for Apache/lighttpd).
+    """
+    try:
+        stat = os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404("File not found")
+    if not os.path.isfile(path):
+        raise Http404("File not found")
+
+    etag = _file_etag(stat)
+    last_modified = int(stat.st_mtime)
+    if content_type is None:
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    if filename is None:
+        filename = os.path.basename(path)
+
+    def finish(response):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        response['Accept-Ranges'] = 'bytes'
+        if max_age is not None:
+            patch_cache_control(response, max_age=max_age)
+        if as_attachment or response.status_code in (200, 206):
+            response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+        return response
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return finish(not_modified)
+
+    offloaded = _offload_response(path, content_type)
+    if offloaded is not None:
+        # The proxy handles ranges itself
+        return finish(offloaded)
+
+    size = stat.st_size
+    range_header = request.META.get('HTTP_RANGE')
+    byte_range = None
+    if range_header and request.method in ('GET', 'HEAD') and _if_range_matches(request, etag, stat.st_mtime):
+        byte_range = _parse_range(range_header, size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return finish(response)
+
+    if byte_range is not None:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(
+            _iter_file_range(path, start, length, settings.FILE_DELIVERY_CHUNK_SIZE),
+            status=206,
+            content_type=content_type,
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(length)
+        return finish(response)
+
+    response = FileResponse(open(path, 'rb'), content_type=content_type)
+    response.block_size = settings.FILE_DELIVERY_CHUNK_SIZE
+    return finish(response)
@@ -0,0 +1,117 @@
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+from datetime import datetime, timedelta
+import logging
+import threading
+
+from core.models import GitHubActivitySnapshot
+from lib.github_client import GitHubClient
+from lib.page_cache import invalidate_pages
+
+logger = logging.getLogger(__name__)
+
+GITHUB_TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_github_client():
+    """Process-wide client, so refreshes reuse the same pooled connections"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = GitHubClient(
+                    base_url=settings.GITHUB_API_URL,
+                    token=settings.GITHUB_TOKEN,
+                    timeout=settings.GITHUB_REQUEST_TIMEOUT,
+                )
+    return _client
+
+
+def fetch_github_activity(etags=None):
+    """Fetch the latest repositories and their latest commits as JSON-serialisable data"""
+    if etags is None:
+        etags = {}
+    return get_github_client().fetch_activity(settings.GITHUB_USERNAME, etags)
+
+
+def refresh_github_activity(snapshot=None):
+    """Fetch from GitHub and store a new snapshot. Returns True on success."""
+    if snapshot is None:
+        snapshot, _ = GitHubActivitySnapshot.objects.get_or_create(username=settings.GITHUB_USERNAME)
+    etags = dict(snapshot.etags)
+    try:
+        data = fetch_github_activity(etags)
+    except Exception as e:
+        # refresh_started_at is left in place, so the next attempt waits out the lock timeout
+        logger.error(f"Failed to refresh GitHub activity for {snapshot.username}: {str(e)}")
+        return False
+
+    GitHubActivitySnapshot.objects.filter(pk=snapshot.pk).update(
+        data=data,
+        etags=etags,
+        fetched_at=timezone.now(),
+        refresh_started_at=None,
+    )
+    invalidate_pages('github')
+    return True
+
+
+def _claim_refresh(snapshot):
+    """Mark the snapshot as refreshing unless another process already did. Returns True if claimed."""
+    now = timezone.now()
+    lock_expired = now - timedelta(seconds=settings.GITHUB_REFRESH_LOCK_TIMEOUT)
+    claimed = GitHubActivitySnapshot.objects.filter(pk=snapshot.pk).filter(
+        Q(refresh_started_at__isnull=True) | Q(refresh_started_at__lt=lock_expired)
+    ).update(refresh_started_at=now)
+    return claimed == 1
+
+
+def _refresh_in_background(snapshot):
+    try:
+        refresh_github_activity(snapshot)
+    finally:
+        connection.close()
+
+
+def _parse_activity(data):
+    """Turn stored commit timestamps back into datetimes for the template"""
+    activity = []
+    for repo in data:
+        repo_dict = {}
+        for name, commits in repo.items():
+            commit_list = []
+            for commit in commits:
+                commit = dict(commit)
+                try:
+                    commit['time'] = datetime.strptime(commit['time'], GITHUB_TIME_FORMAT)
+                except (KeyError, TypeError, ValueError):
+                    commit['time'] = None
+                commit_list.append(commit)
+            repo_dict[name] = commit_list
+        activity.append(repo_dict)
+    return activity
+
+
+def get_github_activity():
+    """
+    Return the stored activity feed straight away. If the snapshot is missing or
+    older than GITHUB_ACTIVITY_TTL, a background refresh is started and the
+    stale copy is served in the meantime.
+    """
+    # The ETag cache is only needed by the refresh, so keep it out of the page request
+    snapshot = GitHubActivitySnapshot.objects.defer('etags').filter(username=settings.GITHUB_USERNAME).first()
+    if snapshot is None:
+        snapshot, _ = GitHubActivitySnapshot.objects.get_or_create(username=settings.GITHUB_USERNAME)
+
+    ttl = timedelta(seconds=settings.GITHUB_ACTIVITY_TTL)
+    is_stale = snapshot.fetched_at is None or timezone.now() - snapshot.fetched_at > ttl
+    if is_stale and _claim_refresh(snapshot):
+        threading.Thread(target=_refresh_in_background, args=(snapshot,), daemon=True).start()
+
+    return _parse_activity(snapshot.data)
@@ -0,0 +1,114 @@
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+import logging
+import requests
+import threading
+
+logger = logging.getLogger(__name__)
+
+GITHUB_BASE_URL = 'https://api.github.com'
+
+
+class GitHubClient:
+    """
+    Small GitHub REST client for the activity feed.
+
+    One pooled keep-alive session is shared by all calls, per-repo requests run
+    concurrently in a thread pool, and every GET is conditional: responses are
+    stored with their ETag in `etags` ({url: {'etag': ..., 'body': ...}}) so an
+    unchanged resource comes back as a 304, which GitHub does not count against
+    the rate limit.
+    """
+
+    def __init__(self, base_url=GITHUB_BASE_URL, token=None, timeout=5, max_workers=4):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['Accept'] = 'application/vnd.github+json'
+        if token:
+            self.session.headers['Authorization'] = f"Bearer {token}"
+        self._etags_lock = threading.Lock()
+
+    def get_json(self, path, etags, params=None, seen=None):
+        """
+        GET a JSON resource, answering from `etags` when GitHub replies 304
+        Not Modified. The URL is added to `seen`, if given.
+        """
+        url = f"{self.base_url}{path}"
+        cache_key = requests.Request('GET', url, params=params).prepare().url
+        with self._etags_lock:
+            cached = etags.get(cache_key)
+            if seen is not None:
+                seen.add(cache_key)
+
+        headers = {}
+        if cached:
+            headers['If-None-Match'] = cached['etag']
+        response = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+
+        if response.status_code == 304 and cached:
+            return cached['body']
+        response.raise_for_status()
+
+        body = response.json()
+        etag = response.headers.get('ETag')
+        if etag:
+            with self._etags_lock:
+                etags[cache_key] = {'etag': etag, 'body': body}
+        return body
+
+    def get_repositories(self, username, etags, limit=3, seen=None):
+        return self.get_json(
+            f"/users/{username}/repos",
+            etags,
+            params={'sort': 'created', 'direction': 'desc', 'per_page': limit},
+            seen=seen,
+        )[:limit]
+
+    def get_commits(self, username, repo_name, etags, limit=3, seen=None):
+        return self.get_json(
+            f"/repos/{username}/{repo_name}/commits",
+            etags,
+            params={'per_page': limit},
+            seen=seen,
+        )[:limit]
+
+    def fetch_activity(self, username, etags, repo_limit=3, commit_limit=3):
+        """
+        Latest repositories with their latest commits, as [{repo_name: [commit, ...]}, ...].
+        Entries of `etags` for URLs this fetch no longer requests (repositories
+        that dropped out of the latest ones) are removed.
+        """
+        seen = set()
+        repositories = self.get_repositories(username, etags, limit=repo_limit, seen=seen)
+        names = [repo.get('name') for repo in repositories]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = executor.map(
+                lambda name: self.get_commits(username, name, etags, limit=commit_limit, seen=seen),
+                names,
+            )
+            commits_by_repo = list(results)
+
+        for cache_key in set(etags) - seen:
+            del etags[cache_key]
+
+        data = []
+        for name, commits in zip(names, commits_by_repo):
+            commit_list = []
+            for commit in commits:
+                commit_list.append({
+                    'author': commit.get('commit', {}).get('author', {}).get('name', ''),
+                    'committer': commit.get('commit', {}).get('committer', {}).get('name', ''),
+                    'message': commit.get('commit', {}).get('message', ''),
+                    'time': commit.get('commit', {}).get('committer', {}).get('date', ''),
+                })
+            data.append({name: commit_list})
+        return data
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,148 @@
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+import logging
+import os
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+# Formats stored as they came in; anything else (BMP, TIFF, ...) is converted
+KEPT_FORMATS = {'JPEG', 'PNG', 'WEBP'}
+EXTENSIONS = {'JPEG': ('.jpg', '.jpeg'), 'PNG': ('.png',), 'WEBP': ('.webp',)}
+
+
+def _open(file):
+    from PIL import Image
+
+    file.seek(0)
+    # Pillow only reads the header here; pixels are decoded later, already scaled down for JPEGs
+    return Image.open(file)
+
+
+def _check_pixels(image):
+    width, height = image.size
+    if width * height > settings.IMAGE_INGEST_MAX_PIXELS:
+        raise ValidationError(
+            f'Image is {width}x{height}, over the limit of {settings.IMAGE_INGEST_MAX_PIXELS:,} pixels.',
+            code='image_too_large',
+        )
+
+
+def validate_image_upload(value):
+    """Model field validator: reject decompression bombs from their header, before anything is decoded"""
+    if not value or getattr(value, '_committed', True):
+        return
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        _check_pixels(_open(value.file))
+    except (Image.DecompressionBombError, UnidentifiedImageError, OSError):
+        raise ValidationError('Upload a valid image.', code='invalid_image')
+    finally:
+        value.file.seek(0)
+
+
+def normalize_image(file):
+    """
+    Re-encode an uploaded image: downscale so its longest edge is at most
+    IMAGE_INGEST_MAX_EDGE, apply and drop the EXIF orientation with the rest
+    of the metadata, and recompress at IMAGE_INGEST_QUALITY. The output is a
+    spooled temporary file (in memory up to FILE_UPLOAD_MAX_MEMORY_SIZE).
+
+    Returns (output, stats) or None when the image is better kept as is
+    (animations, or re-encoding a small metadata-free file made it bigger).
+    """
+    from PIL import ImageOps
+
+    original_size = file.size
+    image = _open(file)
+    _check_pixels(image)
+    if getattr(image, 'is_animated', False):
+        return None
+
+    original_format = image.format
+    original_dimensions = image.size
+    has_metadata = bool(image.info.get('exif') or image.info.get('xmp') or image.info.get('comment'))
+    icc_profile = image.info.get('icc_profile')
+    # Palette and greyscale images can be transparent without an 'A' band
+    has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+    if has_alpha and image.mode not in ('RGBA', 'LA'):
+        # Resampling and re-encoding a palette would drop or misplace the transparent index
+        image = image.convert('RGBA')
+
+    max_edge = settings.IMAGE_INGEST_MAX_EDGE
+    # Scaled before rotating: thumbnail() lets the JPEG decoder skip detail at load time
+    image.thumbnail((max_edge, max_edge))
+    image = ImageOps.exif_transpose(image)
+    resized = max(image.size) < max(original_dimensions)
+
+    fmt = original_format if original_format in KEPT_FORMATS else ('PNG' if has_alpha else 'JPEG')
+    if fmt == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+
+    options = {'optimize': True}
+    if fmt in ('JPEG', 'WEBP'):
+        options['quality'] = settings.IMAGE_INGEST_QUALITY
+    if fmt == 'JPEG':
+        options['progressive'] = True
+    if icc_profile:
+        # Colour profile only, EXIF/XMP are not carried over
+        options['icc_profile'] = icc_profile
+
+    output = tempfile.SpooledTemporaryFile(max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+    image.save(output, fmt, **options)
+    stored_size = output.tell()
+    if stored_size >= original_size and not resized and not has_metadata and fmt == original_format:
+        output.close()
+        return None
+    output.seek(0)
+
+    stats = {
+        'format': fmt,
+        'original_size': original_size,
+        'stored_size': stored_size,
+        'original_width': original_dimensions[0],
+        'original_height': original_dimensions[1],
+        'stored_width': image.size[0],
+        'stored_height': image.size[1],
+    }
+    return output, stats
+
+
+def ingest_image(field_file):
+    """
+    Normalize a newly assigned upload and store it, before the model row is
+    written (call from pre_save). Files already in storage are left alone.
+    Records the saving as a core.ImageIngest row and returns it.
+    """
+    if not field_file or field_file._committed:
+        return None
+    result = normalize_image(field_file.file)
+    if result is None:
+        field_file.file.seek(0)
+        return None
+
+    output, stats = result
+    name = field_file.name
+    base, extension = os.path.splitext(name)
+    if extension.lower() not in EXTENSIONS[stats['format']]:
+        name = base + EXTENSIONS[stats['format']][0]
+    with output:
+        content = File(output, name=os.path.basename(name))
+        content.size = stats['stored_size']
+        # Saved here, so FileField.pre_save finds the file committed and does not store the original
+        field_file.save(name, content, save=False)
+
+    ImageIngest = apps.get_model('core', 'ImageIngest')
+    record = ImageIngest.objects.create(
+        name=field_file.name,
+        bytes_saved=stats['original_size'] - stats['stored_size'],
+        **stats,
+    )
+    logger.info(
+        f"Ingested {field_file.name}: {stats['original_size']} -> {stats['stored_size']} bytes, "
+        f"{stats['original_width']}x{stats['original_height']} -> {stats['stored_width']}x{stats['stored_height']}"
+    )
+    return record
@@ -0,0 +1,239 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.dispatch import Signal
+from functools import partial
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# (model label, image field) -> JSONField holding its variants
+IMAGE_FIELDS = {
+    ('blog.Post', 'featured_image'): 'featured_image_variants',
+    ('projects.ProjectImage', 'image'): 'image_variants',
+    ('resume.Resume', 'image'): 'image_variants',
+}
+
+FORMATS = {
+    'webp': ('WEBP', 'image/webp'),
+    'jpeg': ('JPEG', 'image/jpeg'),
+}
+VARIANTS_DIR = 'variants'
+
+# Sent with sender=model, pk, field_name once variants are stored (they are written with update(), not save())
+variants_stored = Signal()
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def generate_variants(source_path, media_root, widths, formats, quality):
+    """
+    Resize one image into every configured width and format. Runs in a worker
+    process, so it only uses Pillow and the filesystem.
+
+    Outputs are named after the source content hash and the width, so the
+    same upload always maps to the same files and existing ones are reused.
+    Images are never upscaled; widths above the original collapse into one
+    full-width variant. Returns the record stored on the model.
+    """
+    from PIL import Image, ImageOps
+
+    digest = hashlib.sha256()
+    with open(source_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    digest = digest.hexdigest()[:24]
+
+    with Image.open(source_path) as image:
+        image = ImageOps.exif_transpose(image)
+        original_width, original_height = image.size
+        targets = sorted({min(width, original_width) for width in widths})
+        record = {
+            'hash': digest,
+            'width': original_width,
+            'height': original_height,
+            'widths': list(widths),
+            'formats': list(formats),
+        }
+        for fmt in formats:
+            pil_format = FORMATS[fmt][0]
+            variants = []
+            for width in targets:
+                name = f'{VARIANTS_DIR}/{digest[:2]}/{digest}-{width}.{fmt}'
+                path = os.path.join(media_root, name)
+                if not os.path.exists(path):
+                    height = max(1, round(original_height * width / original_width))
+                    resized = image.resize((width, height), Image.LANCZOS) if width != original_width else image.copy()
+                    if pil_format == 'JPEG' and resized.mode != 'RGB':
+                        resized = _flatten(resized)
+                    elif resized.mode not in ('RGB', 'RGBA'):
+                        resized = resized.convert('RGBA')
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    # Written aside and renamed, so a concurrent run never serves a half-written file
+                    temporary = f'{path}.{os.getpid()}.tmp'
+                    resized.save(temporary, pil_format, quality=quality, optimize=True)
+                    os.replace(temporary, path)
+                variants.append([width, name])
+            record[fmt] = variants
+    return record
+
+
+def _flatten(image):
+    """JPEG has no alpha: composite transparent images onto white"""
+    from PIL import Image
+
+    image = image.convert('RGBA')
+    background = Image.new('RGB', image.size, (255, 255, 255))
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+
+def variants_field(model, field_name):
+    return IMAGE_FIELDS[(model._meta.label, field_name)]
+
+
+def get_variants(field_file):
+    """The variants recorded for an image field value, or None while they are missing or stale"""
+    if not field_file:
+        return None
+    attname = IMAGE_FIELDS.get((field_file.field.model._meta.label, field_file.field.name))
+    if attname is None:
+        return None
+    record = getattr(field_file.instance, attname, None) or {}
+    if record.get('source') != field_file.name:
+        return None
+    return record
+
+
+def needs_variants(instance, field_name):
+    field_file = getattr(instance, field_name)
+    if not field_file:
+        return False
+    record = getattr(instance, variants_field(type(instance), field_name)) or {}
+    return (
+        record.get('source') != field_file.name
+        or record.get('widths') != list(settings.IMAGE_VARIANT_WIDTHS)
+        or record.get('formats') != list(settings.IMAGE_VARIANT_FORMATS)
+    )
+
+
+def _get_executor(replace=False):
+    global _executor
+    with _executor_lock:
+        if replace and _executor is not None:
+            _executor.shutdown(wait=False)
+            _executor = None
+        if _executor is None:
+            # spawn: workers must not inherit the web process's threads and database connections
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_VARIANT_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _executor
+
+
+def _job(instance, field_name):
+    field_file = getattr(instance, field_name)
+    return (
+        field_file.path,
+        str(settings.MEDIA_ROOT),
+        list(settings.IMAGE_VARIANT_WIDTHS),
+        list(settings.IMAGE_VARIANT_FORMATS),
+        settings.IMAGE_VARIANT_QUALITY,
+    )
+
+
+def store_variants(label, pk, field_name, source, record):
+    """Save a record, unless the image was replaced while it was being generated"""
+    model = apps.get_model(label)
+    record = dict(record, source=source)
+    updated = model.objects.filter(pk=pk, **{field_name: source}).update(
+        **{variants_field(model, field_name): record}
+    )
+    if updated:
+        variants_stored.send(sender=model, pk=pk, field_name=field_name)
+    return updated
+
+
+def _stored(label, pk, field_name, source, future):
+    # Runs on the executor's result thread, which keeps its own database connection
+    close_old_connections()
+    try:
+        store_variants(label, pk, field_name, source, future.result())
+    except Exception as e:
+        logger.warning(f"Image variants failed for {label} {pk} ({source}): {e}")
+
+
+def build_variants(instance, field_name):
+    """Generate and store the variants of one image in this process, returns the record"""
+    source = getattr(instance, field_name).name
+    record = generate_variants(*_job(instance, field_name))
+    store_variants(instance._meta.label, instance.pk, field_name, source, record)
+    return dict(record, source=source)
+
+
+def schedule_variants(instance, field_name):
+    """
+    Queue variant generation for an image field after the transaction commits,
+    if the stored variants are missing or were built from another file or
+    configuration. With IMAGE_VARIANT_WORKERS = 0 they are built inline.
+    """
+    if not needs_variants(instance, field_name):
+        return False
+    label, pk = instance._meta.label, instance.pk
+    source = getattr(instance, field_name).name
+
+    def submit():
+        if not settings.IMAGE_VARIANT_WORKERS:
+            try:
+                build_variants(instance, field_name)
+            except Exception as e:
+                logger.warning(f"Image variants failed for {label} {pk} ({source}): {e}")
+            return
+        job = _job(instance, field_name)
+        try:
+            future = _get_executor().submit(generate_variants, *job)
+        except BrokenProcessPool:
+            # A worker died (killed, out of memory): start a fresh pool
+            future = _get_executor(replace=True).submit(generate_variants, *job)
+        future.add_done_callback(partial(_stored, label, pk, field_name, source))
+
+    transaction.on_commit(submit)
+    return True
+
+
+def build_all_variants(force=False):
+    """
+    Build missing or stale variants for every registered image field (all of
+    them with `force`) on the process pool, waiting for the results.
+    Returns (built, failed).
+    """
+    jobs = []
+    for (label, field_name), attname in IMAGE_FIELDS.items():
+        model = apps.get_model(label)
+        instances = model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True}).only(
+            'pk', field_name, attname,
+        )
+        for instance in instances.iterator():
+            if force or needs_variants(instance, field_name):
+                jobs.append((label, instance.pk, field_name, getattr(instance, field_name).name, _job(instance, field_name)))
+
+    built = failed = 0
+    workers = settings.IMAGE_VARIANT_WORKERS or 1
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        futures = [(job, executor.submit(generate_variants, *args)) for *job, args in jobs]
+        for (label, pk, field_name, source), future in futures:
+            try:
+                store_variants(label, pk, field_name, source, future.result())
+                built += 1
+            except Exception as e:
+                logger.warning(f"Image variants failed for {label} {pk} ({source}): {e}")
+                failed += 1
+    return built, failed
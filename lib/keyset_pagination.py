@@ -0,0 +1,150 @@
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.http import urlencode
+from datetime import datetime
+import base64
+import binascii
+import json
+
+
+class KeysetPage:
+    """
+    One page of a keyset (cursor) paginated queryset. Unlike Paginator there is
+    no COUNT(*) and no OFFSET, so every page costs the same as the first one.
+    Page numbers are only tracked for display, they cannot be jumped to.
+    """
+
+    def __init__(self, object_list, number, next_cursor=None, previous_cursor=None, param='cursor'):
+        self.object_list = object_list
+        self.number = number
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.param = param
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.number > 1
+
+    def next_page_query(self):
+        return '?' + urlencode({self.param: self.next_cursor}) if self.next_cursor else ''
+
+    def previous_page_query(self):
+        if self.number <= 2 or not self.previous_cursor:
+            return '?'
+        return '?' + urlencode({self.param: self.previous_cursor})
+
+    def page_links(self):
+        """Elided links around the current page: 1 … n-1 n n+1"""
+        links = []
+        if self.number > 1:
+            links.append({'number': 1, 'query': '?'})
+        if self.number > 3:
+            links.append({'ellipsis': True})
+        if self.number > 2:
+            links.append({'number': self.number - 1, 'query': self.previous_page_query()})
+        links.append({'number': self.number, 'current': True})
+        if self.has_next():
+            links.append({'number': self.number + 1, 'query': self.next_page_query()})
+        return links
+
+
+def encode_cursor(values, number, direction):
+    payload = {
+        'v': [value.isoformat() if isinstance(value, datetime) else value for value in values],
+        'n': number,
+        'd': direction,
+    }
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, field_count, datetime_fields=()):
+    """
+    Returns (values, number, direction) or None for a missing or tampered
+    cursor. Values are datetimes at the `datetime_fields` positions and ints
+    everywhere else.
+    """
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = payload['v']
+        if not isinstance(values, list) or len(values) != field_count:
+            return None
+        for index, value in enumerate(values):
+            if index in datetime_fields:
+                value = datetime.fromisoformat(value)
+                if settings.USE_TZ and timezone.is_naive(value):
+                    value = timezone.make_aware(value)
+                values[index] = value
+            else:
+                values[index] = int(value)
+                if not -2**63 <= values[index] < 2**63:
+                    return None
+        number = int(payload['n'])
+        direction = payload['d']
+    except (binascii.Error, ValueError, KeyError, TypeError, IndexError, OverflowError):
+        return None
+    if direction not in ('after', 'before') or number < 1:
+        return None
+    return values, number, direction
+
+
+def _beyond(fields, values, newer):
+    """Q for rows strictly after (older) or before (newer) the cursor in DESC (field1[, field2]) order"""
+    lookup = 'gt' if newer else 'lt'
+    if len(fields) == 1:
+        return Q(**{f'{fields[0]}__{lookup}': values[0]})
+    (first, second), (first_value, second_value) = fields, values
+    return Q(**{f'{first}__{lookup}': first_value}) | Q(**{first: first_value, f'{second}__{lookup}': second_value})
+
+
+def paginate_keyset(queryset, token, per_page, fields=('published_at', 'id'), param='cursor', datetime_fields=(0,)):
+    """
+    Paginate `queryset` newest first by the two `fields` (a timestamp and a
+    unique tiebreaker), or by a single unique field such as an auto id.
+    `token` is the value of the `param` query argument; `datetime_fields`
+    are the positions in `fields` holding datetimes.
+    """
+    cursor = decode_cursor(token, len(fields), datetime_fields=datetime_fields)
+    descending = [f'-{field}' for field in fields]
+    ascending = list(fields)
+
+    if cursor is None:
+        rows = list(queryset.order_by(*descending)[:per_page + 1])
+        number, has_more_newer = 1, False
+        has_more_older = len(rows) > per_page
+        rows = rows[:per_page]
+    else:
+        values, number, direction = cursor
+        if direction == 'after':
+            rows = list(queryset.filter(_beyond(fields, values, newer=False)).order_by(*descending)[:per_page + 1])
+            has_more_older = len(rows) > per_page
+            rows = rows[:per_page]
+            has_more_newer = True
+        else:
+            rows = list(queryset.filter(_beyond(fields, values, newer=True)).order_by(*ascending)[:per_page + 1])
+            has_more_newer = len(rows) > per_page
+            rows = list(reversed(rows[:per_page]))
+            has_more_older = True
+            if not has_more_newer:
+                number = 1
+
+    def key(obj):
+        return [getattr(obj, field) for field in fields]
+
+    next_cursor = encode_cursor(key(rows[-1]), number + 1, 'after') if rows and has_more_older else None
+    previous_cursor = encode_cursor(key(rows[0]), number - 1, 'before') if rows and has_more_newer else None
+    return KeysetPage(rows, number, next_cursor=next_cursor, previous_cursor=previous_cursor, param=param)
@@ -0,0 +1,19 @@
+from django.conf import settings
+import hashlib
+import json
+import markdown
+
+
+def get_extensions():
+    return list(settings.MARKDOWN_EXTENSIONS)
+
+
+def markdown_hash(text):
+    """Hash of the markdown source plus the extension config used to render it"""
+    payload = json.dumps(get_extensions()) + '\n' + (text or '')
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def render_markdown(text):
+    md = markdown.Markdown(extensions=get_extensions())
+    return md.convert(text or '')
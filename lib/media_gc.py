@@ -0,0 +1,129 @@
+from collections import Counter
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from datetime import timedelta
+import logging
+import os
+import time
+
+from lib.content_storage import MEDIA_FIELDS
+from lib.image_variants import IMAGE_FIELDS
+
+logger = logging.getLogger(__name__)
+
+
+def referenced_names():
+    """
+    Every media name the database points at: the file fields in MEDIA_FIELDS
+    and the variant files recorded next to the image fields. Rows are
+    streamed, only the names are kept.
+    """
+    names = set()
+    for label, fields in MEDIA_FIELDS.items():
+        for row in apps.get_model(label).objects.values_list(*fields).iterator(chunk_size=2000):
+            names.update(name for name in row if name)
+    for (label, _), attname in IMAGE_FIELDS.items():
+        records = apps.get_model(label).objects.exclude(**{attname: {}}).values_list(attname, flat=True)
+        for record in records.iterator(chunk_size=500):
+            for fmt in record.get('formats', ()):
+                names.update(name for _, name in record.get(fmt, ()))
+    return names
+
+
+def iter_media_files(root):
+    """Yield (name relative to root, os.DirEntry) for every file below root, one directory at a time"""
+    pending = [root]
+    while pending:
+        directory = pending.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        yield os.path.relpath(entry.path, root).replace(os.sep, '/'), entry
+        except FileNotFoundError:
+            continue
+
+
+def _remove_empty_parents(path, root):
+    directory = os.path.dirname(path)
+    while os.path.normpath(directory) != os.path.normpath(root):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            break
+        directory = os.path.dirname(directory)
+
+
+class OrphanReport:
+    """Orphans found (files, bytes, by_directory) and, with delete, the ones actually removed"""
+
+    def __init__(self):
+        self.files = 0
+        self.bytes = 0
+        self.skipped_recent = 0
+        self.by_directory = Counter()
+        self.deleted = 0
+        self.deleted_bytes = 0
+
+    def add(self, name, size):
+        self.files += 1
+        self.bytes += size
+        self.by_directory[name.split('/', 1)[0] if '/' in name else '.'] += size
+
+
+def collect_orphans(grace_seconds, delete=False, on_orphan=None):
+    """
+    Walk MEDIA_ROOT and find files no database row references. Files
+    modified within `grace_seconds` are left alone, since an upload may be
+    stored before the row that references it commits. So are blobs stored
+    or released within that window: a deduplicated upload reuses the
+    existing file and keeps its old mtime. With `delete`, the orphans are
+    removed together with their StoredBlob rows and any directories they
+    leave empty. Returns an OrphanReport.
+    """
+    root = str(settings.MEDIA_ROOT)
+    referenced = referenced_names()
+    cutoff = time.time() - grace_seconds
+    cutoff_datetime = timezone.now() - timedelta(seconds=grace_seconds)
+    StoredBlob = apps.get_model('core', 'StoredBlob')
+    recent_blobs = Q(ref_count__gt=0) | Q(unreferenced_since__gte=cutoff_datetime) | Q(created_at__gte=cutoff_datetime)
+    recent = set(StoredBlob.objects.filter(recent_blobs).values_list('name', flat=True))
+    report = OrphanReport()
+
+    for name, entry in iter_media_files(root):
+        if name in referenced:
+            continue
+        stat = entry.stat(follow_symlinks=False)
+        if stat.st_mtime > cutoff or name in recent:
+            report.skipped_recent += 1
+            continue
+        report.add(name, stat.st_size)
+        if on_orphan is not None:
+            on_orphan(name, stat.st_size)
+        if delete:
+            with transaction.atomic():
+                # Re-checked under the row lock the storage takes when it reuses a blob
+                blob = StoredBlob.objects.select_for_update().filter(name=name).first()
+                if blob is not None and StoredBlob.objects.filter(recent_blobs, pk=blob.pk).exists():
+                    report.skipped_recent += 1
+                    continue
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    continue
+                if blob is not None:
+                    blob.delete()
+            _remove_empty_parents(entry.path, root)
+            report.deleted += 1
+            report.deleted_bytes += stat.st_size
+
+    logger.info(
+        f"Media GC: {report.files} orphans, {report.bytes} bytes, "
+        f"{report.deleted} deleted ({report.deleted_bytes} bytes)"
+    )
+    return report
@@ -0,0 +1,132 @@
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import F, Q
+from django.template.loader import get_template
+from django.urls import reverse
+from django.utils import timezone
+from datetime import timedelta
+import logging
+import time
+
+from core.models import EmailSubscription, Newsletter
+from lib.markdown_renderer import render_markdown
+
+logger = logging.getLogger(__name__)
+
+UNSUBSCRIBE_PLACEHOLDER = '__UNSUBSCRIBE_URL__'
+
+
+def claim_newsletter(newsletter_id, resume=False):
+    """
+    Move a queued newsletter to 'sending' and take its lease. With resume=True
+    a newsletter left in 'sending' can be picked up again, but only once its
+    heartbeat is older than NEWSLETTER_LEASE_TIMEOUT, so a broadcast that is
+    still running is never taken over. Returns the newsletter or None.
+    """
+    now = timezone.now()
+    claimable = Q(status='queued')
+    if resume:
+        expired = now - timedelta(seconds=settings.NEWSLETTER_LEASE_TIMEOUT)
+        claimable |= Q(status='sending') & (Q(heartbeat_at__isnull=True) | Q(heartbeat_at__lt=expired))
+    claimed = Newsletter.objects.filter(claimable, pk=newsletter_id).update(
+        status='sending', claimed_at=now, heartbeat_at=now,
+    )
+    if not claimed:
+        return None
+    newsletter = Newsletter.objects.get(pk=newsletter_id)
+    if newsletter.started_at is None:
+        newsletter.started_at = timezone.now()
+        newsletter.save(update_fields=['started_at'])
+    return newsletter
+
+
+def render_newsletter(newsletter):
+    """Render the whole email once, with a placeholder where the unsubscribe link goes"""
+    template = get_template('emails/newsletter.html')
+    return template.render({
+        'subject': newsletter.subject,
+        'body': render_markdown(newsletter.body),
+        'unsubscribe_url': UNSUBSCRIBE_PLACEHOLDER,
+    })
+
+
+def build_unsubscribe_url(uuid):
+    return settings.SITE_URL.rstrip('/') + reverse('unsubscribe', kwargs={'uuid': uuid})
+
+
+def broadcast_newsletter(newsletter, connection=None, chunk_size=None, rate=None):
+    """
+    Send a claimed newsletter to every subscriber after its checkpoint.
+
+    Subscribers are streamed in id order and the checkpoint is written before
+    each send, so a crashed broadcast resumes without mailing anyone twice
+    (at worst the one subscriber in flight during the crash is skipped).
+    The checkpoint only goes through while this run holds the lease taken by
+    claim_newsletter; once another worker has taken it over, this run stops.
+    Returns (sent, failed) for this run.
+    """
+    chunk_size = chunk_size or settings.NEWSLETTER_CHUNK_SIZE
+    rate = settings.NEWSLETTER_SEND_RATE if rate is None else rate
+    min_interval = 1 / rate if rate > 0 else 0
+
+    html = render_newsletter(newsletter)
+    if connection is None:
+        connection = get_connection()
+
+    subscribers = (
+        EmailSubscription.objects
+        .filter(agreement=True, pk__gt=newsletter.last_subscriber_id)
+        .order_by('pk')
+        .only('pk', 'email', 'uuid')
+    )
+
+    leased = Newsletter.objects.filter(pk=newsletter.pk, status='sending', claimed_at=newsletter.claimed_at)
+    sent = failed = 0
+    # Outcome of the previous send, written with the next checkpoint: one UPDATE per subscriber
+    pending_sent = pending_failed = 0
+    last_send = 0
+    for subscriber in subscribers.iterator(chunk_size=chunk_size):
+        owned = leased.update(
+            last_subscriber_id=subscriber.pk,
+            heartbeat_at=timezone.now(),
+            sent_count=F('sent_count') + pending_sent,
+            failed_count=F('failed_count') + pending_failed,
+        )
+        if not owned:
+            logger.warning(f"Newsletter {newsletter.pk} was taken over by another worker, stopping after {sent} sent")
+            return sent, failed
+        pending_sent = pending_failed = 0
+
+        wait = min_interval - (time.monotonic() - last_send)
+        if wait > 0:
+            time.sleep(wait)
+        last_send = time.monotonic()
+
+        message = EmailMessage(
+            subject=newsletter.subject,
+            body=html.replace(UNSUBSCRIBE_PLACEHOLDER, build_unsubscribe_url(subscriber.uuid)),
+            to=[subscriber.email],
+            connection=connection,
+        )
+        message.content_subtype = 'html'
+        try:
+            connection.open()
+            message.send()
+        except Exception as e:
+            failed += 1
+            pending_failed = 1
+            logger.error(f"Failed to send newsletter {newsletter.pk} to {subscriber.email}: {str(e)}")
+            connection.close()
+            continue
+
+        sent += 1
+        pending_sent = 1
+
+    leased.update(
+        status='sent',
+        finished_at=timezone.now(),
+        sent_count=F('sent_count') + pending_sent,
+        failed_count=F('failed_count') + pending_failed,
+    )
+    logger.info(f"Newsletter {newsletter.pk} broadcast finished: {sent} sent, {failed} failed")
+    return sent, failed
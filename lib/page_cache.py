@@ -0,0 +1,233 @@
+from collections import Counter
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils.cache import cc_delim_re
+from django.utils.module_loading import import_string
+import atexit
+import hashlib
+import logging
+import re
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode
+
+logger = logging.getLogger(__name__)
+
+CSRF_INPUT_RE = re.compile(rb'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+CSRF_PLACEHOLDER = b'__page_cache_csrf_token__'
+IGNORED_QUERY_PARAMS = re.compile(r'^(utm_\w+|fbclid|gclid)$')
+# Headers copied from the stored response; cookies and per-request headers are left out
+STORED_HEADERS = ('Content-Type', 'Content-Language', 'X-Frame-Options')
+
+
+def _cache():
+    return caches[settings.PAGE_CACHE_ALIAS]
+
+
+def _tag_key(tag):
+    return f'page:tag:{tag}'
+
+
+def add_page_tags(request, *tags, on_hit=None):
+    """
+    Let the anonymous response to `request` be cached until one of `tags` is
+    invalidated (see invalidate_pages). Views opt in by calling this; pages
+    without tags are never cached. `on_hit` is a (dotted path, args) pair
+    called when the cached page is served, for work the view must still do
+    on every request, such as counting a view.
+    """
+    request._page_cache_tags = getattr(request, '_page_cache_tags', set()) | set(tags)
+    if on_hit is not None:
+        request._page_cache_on_hit = on_hit
+
+
+def invalidate_pages(*tags):
+    """
+    Expire every cached page depending on any of `tags`, once the current
+    transaction commits (a page rendered before that would still show the
+    old rows). Versions are timestamps, so no read is needed.
+    """
+    tags = set(tags)
+    if not tags:
+        return
+
+    def bump():
+        version = time.time_ns()
+        _cache().set_many({_tag_key(tag): version for tag in tags}, timeout=None)
+
+    transaction.on_commit(bump)
+
+
+def page_key(request):
+    """Scheme, host, path and the query string with its parameters sorted and tracking parameters dropped"""
+    query = sorted(
+        (name, value) for name, value in parse_qsl(request.META.get('QUERY_STRING', ''), keep_blank_values=True)
+        if not IGNORED_QUERY_PARAMS.match(name)
+    )
+    raw = f'{request.scheme}://{request.get_host()}{request.path}?{urlencode(query)}'
+    return f'page:entry:{hashlib.sha256(raw.encode()).hexdigest()}'
+
+
+class PageCacheStats:
+    """Hit/miss/bypass counters, kept per process and added to the shared cache in batches"""
+
+    def __init__(self, flush_interval=10, flush_size=200):
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self._pending = Counter()
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(self, outcome):
+        with self._lock:
+            self._pending[outcome] += 1
+            due = (
+                sum(self._pending.values()) >= self.flush_size
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            self._last_flush = time.monotonic()
+        cache = _cache()
+        for outcome, count in pending.items():
+            key = f'page:stats:{outcome}'
+            cache.add(key, 0, timeout=None)
+            try:
+                cache.incr(key, count)
+            except ValueError:
+                cache.set(key, count, timeout=None)
+
+    @staticmethod
+    def totals():
+        values = _cache().get_many([f'page:stats:{outcome}' for outcome in ('hit', 'miss', 'bypass')])
+        return {outcome: values.get(f'page:stats:{outcome}', 0) for outcome in ('hit', 'miss', 'bypass')}
+
+    @staticmethod
+    def reset():
+        _cache().delete_many([f'page:stats:{outcome}' for outcome in ('hit', 'miss', 'bypass')])
+
+
+stats = PageCacheStats()
+# Quiet or recycled workers would otherwise take their last counts with them
+atexit.register(stats.flush)
+
+
+class PageCacheMiddleware:
+    """
+    Full-page cache for anonymous GET/HEAD requests to views that called
+    add_page_tags(). Signed-in users, other methods and requests with
+    pending flash messages always reach the view.
+
+    Entries are invalidated through their tags (model signal receivers in
+    core/signals.py call invalidate_pages) and expire after
+    PAGE_CACHE_TIMEOUT at the latest. CSRF tokens in cached forms are
+    replaced with the visitor's own token on every hit. Each response
+    carries X-Page-Cache: hit, miss or bypass.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.PAGE_CACHE_ENABLED:
+            return self.get_response(request)
+        if request.method not in ('GET', 'HEAD') or request.user.is_authenticated or len(get_messages(request)):
+            stats.record('bypass')
+            response = self.get_response(request)
+            response['X-Page-Cache'] = 'bypass'
+            return response
+
+        key = page_key(request)
+        cached = self._lookup(key)
+        if cached is not None:
+            stats.record('hit')
+            return self._replay(request, cached)
+
+        started = time.time_ns()
+        response = self.get_response(request)
+        stats.record('miss')
+        if self._cacheable(request, response):
+            self._store(request, response, key, started)
+        response['X-Page-Cache'] = 'miss'
+        return response
+
+    def _lookup(self, key):
+        cache = _cache()
+        entry = cache.get(key)
+        if entry is None:
+            return None
+        current = cache.get_many([_tag_key(tag) for tag in entry['tags']])
+        for tag, version in entry['tags'].items():
+            # A tag version that was evicted counts as invalidated
+            if current.get(_tag_key(tag)) != version:
+                return None
+        return entry
+
+    def _replay(self, request, entry):
+        content = entry['content']
+        if entry['csrf']:
+            content = content.replace(CSRF_PLACEHOLDER, get_token(request).encode())
+        response = HttpResponse(content, status=entry['status'])
+        for header, value in entry['headers'].items():
+            response[header] = value
+        if entry['on_hit']:
+            path, args = entry['on_hit']
+            try:
+                import_string(path)(*args)
+            except Exception as e:
+                logger.warning(f"Page cache hit hook {path} failed: {e}")
+        response['X-Page-Cache'] = 'hit'
+        return response
+
+    def _cacheable(self, request, response):
+        if not getattr(request, '_page_cache_tags', None):
+            return False
+        if response.status_code != 200 or response.streaming:
+            return False
+        if response.cookies or (hasattr(request, 'session') and request.session.modified):
+            return False
+        if len(get_messages(request)):
+            return False
+        cache_control = response.get('Cache-Control', '')
+        if 'private' in cache_control or 'no-store' in cache_control:
+            return False
+        vary = {header.lower() for header in cc_delim_re.split(response.get('Vary', '')) if header}
+        # Cookie is only added by the CSRF token, which is swapped out below
+        return vary <= {'cookie'}
+
+    def _store(self, request, response, key, started):
+        cache = _cache()
+        tags = request._page_cache_tags
+        tag_keys = {_tag_key(tag): tag for tag in tags}
+        versions = cache.get_many(list(tag_keys))
+        missing = {tag_key: started for tag_key in tag_keys if tag_key not in versions}
+        if missing:
+            for tag_key, version in missing.items():
+                cache.add(tag_key, version, timeout=None)
+            versions.update(cache.get_many(list(missing)))
+        if any(versions.get(tag_key) is None for tag_key in tag_keys):
+            return
+        # Invalidated while the view was rendering: the content may already be stale
+        if any(versions[tag_key] > started for tag_key in tag_keys if tag_key not in missing):
+            return
+
+        content = response.content
+        csrf = bool(request.META.get('CSRF_COOKIE_NEEDS_UPDATE'))
+        if csrf:
+            content = CSRF_INPUT_RE.sub(rb'\1' + CSRF_PLACEHOLDER + rb'\2', content)
+        cache.set(key, {
+            'content': content,
+            'status': response.status_code,
+            'headers': {header: response[header] for header in STORED_HEADERS if response.has_header(header)},
+            'tags': {tag: versions[tag_key] for tag_key, tag in tag_keys.items()},
+            'csrf': csrf,
+            'on_hit': getattr(request, '_page_cache_on_hit', None),
+        }, timeout=settings.PAGE_CACHE_TIMEOUT)
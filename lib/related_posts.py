@@ -0,0 +1,96 @@
+from collections import defaultdict
+from django.conf import settings
+from django.db import transaction
+import heapq
+import logging
+import math
+
+from blog.models import Post
+from lib.page_cache import invalidate_pages
+
+logger = logging.getLogger(__name__)
+
+
+def load_taxonomy():
+    """
+    The sparse post x (category ∪ tag) incidence matrix of published posts,
+    as rows (post -> features) and columns (feature -> posts). Two queries.
+    """
+    rows = defaultdict(set)
+    columns = defaultdict(set)
+    links = [
+        ('c', Post.categories.through.objects.filter(post__status='published').values_list('post_id', 'category_id')),
+        ('t', Post.tags.through.objects.filter(post__status='published').values_list('post_id', 'tag_id')),
+    ]
+    for prefix, pairs in links:
+        for post_id, feature_id in pairs:
+            feature = (prefix, feature_id)
+            rows[post_id].add(feature)
+            columns[feature].add(post_id)
+    return rows, columns
+
+
+def nearest_posts(post_id, rows, columns, published_at, count):
+    """Top `count` posts by cosine similarity of their binary taxonomy vectors, newest first on ties"""
+    features = rows.get(post_id)
+    if not features:
+        return []
+    # Sparse row x matrix product: shared feature counts with every co-occurring post
+    shared = defaultdict(int)
+    for feature in features:
+        for other in columns[feature]:
+            if other != post_id:
+                shared[other] += 1
+    norm = math.sqrt(len(features))
+    scored = (
+        (overlap / (norm * math.sqrt(len(rows[other]))), published_at[other], other)
+        for other, overlap in shared.items()
+    )
+    return [other for _, _, other in heapq.nlargest(count, scored)]
+
+
+def build_related_posts(full=False, batch_size=500):
+    """
+    Recompute and store related_post_ids.
+
+    Incrementally (the default) only posts flagged related_stale are rebuilt,
+    together with the posts whose neighbourhood they can affect: posts sharing
+    a category or tag with them, and posts currently listing them. Returns the
+    number of posts updated.
+    """
+    count = settings.RELATED_POSTS_COUNT
+    stale = set(Post.objects.filter(related_stale=True).values_list('pk', flat=True))
+    if not full and not stale:
+        return 0
+
+    published_at = dict(Post.objects.filter(status='published').values_list('pk', 'published_at'))
+    # Rank ties by recency; posts without a date sort last
+    published_at = {pk: value.timestamp() if value else 0 for pk, value in published_at.items()}
+    current = dict(Post.objects.filter(status='published').values_list('pk', 'related_post_ids'))
+    rows, columns = load_taxonomy()
+
+    if full:
+        affected = set(published_at)
+    else:
+        affected = stale & set(published_at)
+        for post_id in list(affected):
+            for feature in rows.get(post_id, ()):
+                affected |= columns[feature]
+        # Lists pointing at changed, unpublished or deleted posts
+        for post_id, related_ids in current.items():
+            if any(related_id in stale or related_id not in published_at for related_id in related_ids):
+                affected.add(post_id)
+
+    updates = [
+        Post(pk=post_id, related_post_ids=nearest_posts(post_id, rows, columns, published_at, count), related_stale=False)
+        for post_id in affected
+    ]
+    # Drafts and archived posts have no related list until they are published again
+    updates += [Post(pk=post_id, related_post_ids=[], related_stale=False) for post_id in stale - affected]
+
+    with transaction.atomic():
+        for start in range(0, len(updates), batch_size):
+            Post.objects.bulk_update(updates[start:start + batch_size], ['related_post_ids', 'related_stale'])
+        invalidate_pages(*(f'post:{post.pk}' for post in updates))
+    logger.info(f"Related posts rebuilt for {len(updates)} posts ({'full' if full else 'incremental'})")
+    return len(updates)
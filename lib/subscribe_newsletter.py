@@ -1,16 +1,27 @@
 from django.shortcuts import redirect
 from django.contrib import messages
+from django.db import transaction
 from core.forms import EmailSubscriptionForm
 from lib.emails_hanlder import email_new_subscribers
+import logging
+
+logger = logging.getLogger(__name__)
 
 def subscribe_newsletter(request):
     if request.method == 'POST':
         form = EmailSubscriptionForm(request.POST)
         if form.is_valid():
-            subscription_instance = form.save()
-            email_new_subscribers(request, subscription_instance)
-            messages.success(request, 'Thank you for subscribing! We will notify you soon.')
-            return redirect('homepage')
+            # The welcome email is queued in the same transaction as the subscription
+            try:
+                with transaction.atomic():
+                    subscription_instance = form.save()
+                    email_new_subscribers(request, subscription_instance)
+            except Exception as e:
+                logger.error(f"Failed to subscribe {form.cleaned_data.get('email')}: {str(e)}")
+                messages.error(request, 'Something happened. Please try subscribing again later.')
+            else:
+                messages.success(request, 'Thank you for subscribing! We will notify you soon.')
+                return redirect('homepage')
         else:
             if 'email' in form.errors:
                 email_errors = form.errors['email']
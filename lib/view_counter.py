@@ -0,0 +1,97 @@
+from collections import defaultdict
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+import atexit
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ViewCounter:
+    """
+    Buffers page views in process memory and flushes them to the database
+    in batches with atomic F() updates, instead of one UPDATE per request.
+    """
+
+    def __init__(self, model, field, flush_interval, flush_size):
+        self.model = model
+        self.field = field
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self._pending = defaultdict(int)
+        self._pending_total = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(self, pk):
+        """Count one view and flush if the time or size threshold is reached"""
+        with self._lock:
+            self._pending[pk] += 1
+            self._pending_total += 1
+            due = (
+                self._pending_total >= self.flush_size
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+        if due:
+            self.flush()
+
+    def pending(self, pk):
+        """Views recorded by this process that are not flushed yet"""
+        with self._lock:
+            return self._pending.get(pk, 0)
+
+    def flush(self):
+        with self._lock:
+            pending = self._pending
+            self._pending = defaultdict(int)
+            self._pending_total = 0
+            self._last_flush = time.monotonic()
+        if not pending:
+            return 0
+
+        # One UPDATE per distinct increment instead of one per object
+        by_increment = defaultdict(list)
+        for pk, count in pending.items():
+            by_increment[count].append(pk)
+
+        try:
+            with transaction.atomic():
+                for count, pks in by_increment.items():
+                    self.model.objects.filter(pk__in=pks).update(**{self.field: F(self.field) + count})
+        except Exception as e:
+            # Put the views back so the next flush can retry them
+            with self._lock:
+                for pk, count in pending.items():
+                    self._pending[pk] += count
+                    self._pending_total += count
+            logger.error(f"Failed to flush {self.model.__name__}.{self.field}: {str(e)}")
+            return 0
+        return sum(pending.values())
+
+
+_post_counter = None
+_post_counter_lock = threading.Lock()
+
+
+def get_post_view_counter():
+    global _post_counter
+    if _post_counter is None:
+        with _post_counter_lock:
+            if _post_counter is None:
+                from blog.models import Post
+                _post_counter = ViewCounter(
+                    Post,
+                    'views_count',
+                    flush_interval=settings.VIEW_COUNTER_FLUSH_INTERVAL,
+                    flush_size=settings.VIEW_COUNTER_FLUSH_SIZE,
+                )
+                atexit.register(_post_counter.flush)
+    return _post_counter
+
+
+def record_post_view(pk):
+    """Count a view of a post page that was served from the page cache"""
+    get_post_view_counter().record(pk)
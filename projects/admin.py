@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import Project, ProjectImage
+from search.admin import SearchIndexAdminMixin
 
 
 class ProjectImageInline(admin.TabularInline):
@@ -11,10 +12,11 @@ class ProjectImageInline(admin.TabularInline):
 
 
 @admin.register(Project)
-class ProjectAdmin(admin.ModelAdmin):
+class ProjectAdmin(SearchIndexAdminMixin, admin.ModelAdmin):
     list_display = ['title', 'created_by', 'created_at', 'image_count']
     list_filter = ['created_at', 'created_by']
-    search_fields = ['title', 'description', 'technologies']
+    # Descriptions are matched through the search index
+    search_fields = ['title', 'technologies']
     readonly_fields = ['slug', 'created_by', 'created_at', 'updated_at']
     
     def get_inlines(self, request, obj):
@@ -29,6 +31,10 @@ class ProjectAdmin(admin.ModelAdmin):
             obj.created_by = request.user
         super().save_model(request, obj, form, change)
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('created_by').with_image_count()
+    
     def image_count(self, obj):
-        return obj.images.count()
+        return obj.image_total
     image_count.short_description = 'Images'
+    image_count.admin_order_field = 'image_total'
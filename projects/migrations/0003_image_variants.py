@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0002_project_description_hash_project_description_html'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projectimage',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
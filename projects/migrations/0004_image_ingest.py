@@ -0,0 +1,20 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:09
+
+import lib.image_ingest
+import projects.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0003_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='projectimage',
+            name='image',
+            field=models.ImageField(upload_to=projects.models.project_image_upload_path, validators=[lib.image_ingest.validate_image_upload]),
+        ),
+    ]
@@ -1,11 +1,13 @@
 from django.db import models
+from django.db.models import Count, Prefetch
 from uuid import uuid4
 from django.core.exceptions import ValidationError
-from django.db.models.signals import post_delete, post_save
+from django.db.models.signals import post_save, pre_save
 from django.dispatch import receiver
-import os
-import shutil
-from django.conf import settings
+
+from lib.image_ingest import ingest_image, validate_image_upload
+from lib.image_variants import schedule_variants
+from lib.markdown_renderer import markdown_hash, render_markdown
 
 
 def project_image_upload_path(instance, filename):
@@ -17,31 +19,75 @@ def project_image_upload_path(instance, filename):
         # For Project model - this shouldn't be used anymore
         return f'projects/{instance.id}/{filename}'
 
+class ProjectQuerySet(models.QuerySet):
+    def with_featured_image(self):
+        """Preload the featured image for every project in one extra query (read by Project.featured_image)"""
+        return self.prefetch_related(
+            Prefetch('images', queryset=ProjectImage.objects.filter(featured=True), to_attr='featured_images')
+        )
+
+    def with_image_count(self):
+        """Annotate `image_total` instead of running a COUNT per project"""
+        return self.annotate(image_total=Count('images'))
+
+
 # Create your models here.
 class Project(models.Model):
     slug = models.UUIDField(default=uuid4, editable=False, null=False, unique=True)
     title = models.CharField(max_length=200, null=False)
     description = models.TextField(null=False)
+    description_html = models.TextField(blank=True, editable=False, help_text="Rendered markdown of description")
+    description_hash = models.CharField(max_length=64, blank=True, editable=False)
     technologies = models.CharField(max_length=500, help_text="e.g., React, Django, PostgreSQL")
     github_url = models.URLField(null=True, blank=True)
     created_by = models.ForeignKey('auth.User', on_delete=models.CASCADE, editable=False)
     created_at = models.DateTimeField(auto_now_add=True, editable=False)
     updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ProjectQuerySet.as_manager()
     
     def __str__(self):
         return self.title
+
+    def save(self, *args, **kwargs):
+        self.render_description()
+        super().save(*args, **kwargs)
+
+    def render_description(self):
+        """Re-render description_html if description or the markdown config changed. Returns True if rendered."""
+        current_hash = markdown_hash(self.description)
+        if self.description_hash == current_hash:
+            return False
+        self.description_html = render_markdown(self.description)
+        self.description_hash = current_hash
+        return True
+
+    def get_description_html(self):
+        """Return the stored HTML, refreshing it in place when the hash is stale"""
+        if self.render_description() and self.pk:
+            Project.objects.filter(pk=self.pk).update(
+                description_html=self.description_html,
+                description_hash=self.description_hash,
+            )
+        return self.description_html
     
     @property
     def featured_image(self):
         """Get the featured image for this project"""
-        featured = self.images.filter(featured=True).first()
+        if hasattr(self, 'featured_images'):
+            # Preloaded by Project.objects.with_featured_image()
+            featured = self.featured_images[0] if self.featured_images else None
+        else:
+            featured = self.images.filter(featured=True).first()
         return featured.image if featured else None
 
 
 class ProjectImage(models.Model):
     """Model for storing multiple images per project"""
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='images')
-    image = models.ImageField(upload_to=project_image_upload_path)
+    image = models.ImageField(upload_to=project_image_upload_path, validators=[validate_image_upload])
+    # Resized WebP/JPEG copies of image, written by lib/image_variants.py
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     caption = models.CharField(max_length=255, blank=True, help_text="Optional image caption")
     featured = models.BooleanField(default=False, help_text="Mark as featured image for this project")
     order = models.PositiveIntegerField(default=0, help_text="Display order")
@@ -54,18 +100,14 @@ class ProjectImage(models.Model):
         return f"{self.project.title} - Image {self.id}"
 
 
-@receiver(post_delete, sender=Project)
-def delete_project_files(sender, instance, **kwargs):
-    """Delete all project files when project is deleted"""
-    # Delete the entire project folder
-    project_folder = os.path.join(settings.MEDIA_ROOT, 'projects', str(instance.id))
-    if os.path.exists(project_folder):
-        shutil.rmtree(project_folder)
+@receiver(pre_save, sender=ProjectImage)
+def project_image_uploaded(sender, instance, raw=False, **kwargs):
+    """Downscale, strip and recompress a new upload before it is stored"""
+    if not raw:
+        ingest_image(instance.image)
 
 
-@receiver(post_delete, sender=ProjectImage)
-def delete_project_image_file(sender, instance, **kwargs):
-    """Delete image file when ProjectImage is deleted"""
-    if instance.image:
-        if os.path.isfile(instance.image.path):
-            os.remove(instance.image.path)
\ No newline at end of file
+@receiver(post_save, sender=ProjectImage)
+def project_image_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_variants(instance, 'image')
@@ -1,14 +1,12 @@
 from django.shortcuts import render
 from projects.models import Project
-from resume.models import Resume
-import markdown
 from django.shortcuts import get_object_or_404
+from lib.page_cache import add_page_tags
 
 # Create your views here.
 
 def projects_view(request):
-    projects = Project.objects.all()
-    resume = Resume.objects.first()
+    projects = Project.objects.with_featured_image()
     
     # Add split technologies to each project
     for project in projects:
@@ -16,32 +14,26 @@ def projects_view(request):
     
     context = {
         'projects' : projects,
-        'resume': resume,
     }
+    add_page_tags(request, 'projects')
     return render(request, 'projects/projects.html', context=context)
 
 
 def single_project_view(request, slug):
-    project = get_object_or_404(Project, slug=slug)
-    resume = Resume.objects.first()
+    project = get_object_or_404(Project.objects.select_related('created_by'), slug=slug)
     
-    # Get non-featured images for sidebar
-    sidebar_images = project.images.filter(featured=False).order_by('order', 'uploaded_at')
+    # Load all images once and split featured / sidebar (non-featured) in Python
+    images = list(project.images.order_by('order', 'uploaded_at'))
+    project.featured_images = [image for image in images if image.featured]
+    sidebar_images = [image for image in images if not image.featured]
     
-    # Enable tables explicitly with extra extensions
-    md = markdown.Markdown(extensions=[
-        'extra',    # This should include tables
-        'tables',   # Explicitly enable tables
-    ])
-    
-    # Debug: let's see what gets converted
-    converted = md.convert(project.description)
-    
-    project.description = converted
+    # Pre-rendered markdown, only re-rendered when the description hash is stale
+    description_html = project.get_description_html()
     
     context = {
         'project': project,
+        'description_html': description_html,
         'sidebar_images': sidebar_images,
-        'resume': resume,
     }
+    add_page_tags(request, f'project:{project.pk}')
     return render(request, 'projects/single_project.html', context=context)
\ No newline at end of file
@@ -0,0 +1,10 @@
+from django.utils.functional import SimpleLazyObject
+
+from .models import get_resume_snapshot
+
+
+def resume(request):
+    """Expose the cached resume snapshot to every template as `resume`"""
+    return {
+        'resume': SimpleLazyObject(get_resume_snapshot),
+    }
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resume', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resume',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
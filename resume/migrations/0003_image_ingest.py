@@ -0,0 +1,20 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:09
+
+import lib.image_ingest
+import resume.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resume', '0002_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='resume',
+            name='image',
+            field=models.ImageField(upload_to=resume.models.image_upload_path, validators=[lib.image_ingest.validate_image_upload]),
+        ),
+    ]
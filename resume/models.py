@@ -1,8 +1,13 @@
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
 from django.db import models
-from django.db.models.signals import post_delete, pre_save
+from django.db.models import Prefetch
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from phonenumber_field.modelfields import PhoneNumberField
-import os
+
+from lib.image_ingest import ingest_image, validate_image_upload
+from lib.image_variants import schedule_variants, variants_stored
 
 
 # Create your models here.
@@ -22,7 +27,9 @@ def image_upload_path(instance, filename):
 
 
 class Resume(models.Model):
-    image = models.ImageField(upload_to=image_upload_path)
+    image = models.ImageField(upload_to=image_upload_path, validators=[validate_image_upload])
+    # Resized WebP/JPEG copies of image, written by lib/image_variants.py
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     pdf_resume = models.FileField(upload_to=image_upload_path, blank=True, null=True, help_text="Upload your resume as PDF")
     full_name = models.CharField(default='Rouhollah Ghobadinezhad', null=False, max_length=30, blank=False)
     birthday = models.DateField(blank=False, null=False)
@@ -84,37 +91,69 @@ class Other(models.Model):
     description = models.TextField(null=False, blank=False)
 
 
-# Signal handlers to delete files when model instances are deleted
-@receiver(post_delete, sender=Resume)
-def delete_resume_files(sender, instance, **kwargs):
-    """Delete image and PDF files when Resume instance is deleted"""
-    if instance.image:
-        if os.path.isfile(instance.image.path):
-            os.remove(instance.image.path)
-    
-    if instance.pdf_resume:
-        if os.path.isfile(instance.pdf_resume.path):
-            os.remove(instance.pdf_resume.path)
+RESUME_SNAPSHOT_CACHE_KEY = 'resume:snapshot'
+# {% cache %} fragment around the body of resume/resume.html, varied on resume.pk
+RESUME_FRAGMENT_NAME = 'resume_body'
+
+
+def resume_sections_prefetch():
+    """Ordered prefetches for every resume section: one query per section"""
+    return [
+        Prefetch('experiences', queryset=Experience.objects.order_by('-from_date', 'id')),
+        Prefetch('projects', queryset=Project.objects.order_by('-from_date', 'id')),
+        Prefetch('educations', queryset=Education.objects.order_by('-from_date', 'id')),
+        # {% regroup %} needs skills grouped by category
+        Prefetch('skills', queryset=Skill.objects.order_by('category', 'id')),
+        Prefetch('others', queryset=Other.objects.order_by('id')),
+    ]
+
+
+def get_resume_snapshot():
+    """
+    The resume with all its sections prefetched, cached until any resume model
+    changes. Normal page renders read this instead of querying the resume tables.
+    """
+    snapshot = cache.get(RESUME_SNAPSHOT_CACHE_KEY)
+    if snapshot is None:
+        resume = Resume.objects.prefetch_related(*resume_sections_prefetch()).order_by('id').first()
+        # Wrapped in a tuple so "no resume" is cached too
+        snapshot = (resume,)
+        cache.set(RESUME_SNAPSHOT_CACHE_KEY, snapshot, None)
+    return snapshot[0]
+
+
+def invalidate_resume_snapshot(resume_id=None):
+    keys = [RESUME_SNAPSHOT_CACHE_KEY]
+    if resume_id is not None:
+        keys.append(make_template_fragment_key(RESUME_FRAGMENT_NAME, [resume_id]))
+    cache.delete_many(keys)
+
+
+@receiver([post_save, post_delete], sender=Resume)
+@receiver([post_save, post_delete], sender=Experience)
+@receiver([post_save, post_delete], sender=Project)
+@receiver([post_save, post_delete], sender=Education)
+@receiver([post_save, post_delete], sender=Skill)
+@receiver([post_save, post_delete], sender=Other)
+def resume_changed(sender, instance, **kwargs):
+    """Drop the cached resume snapshot and rendered page fragment whenever the resume or one of its sections changes"""
+    resume_id = instance.pk if sender is Resume else instance.connect_to_id
+    invalidate_resume_snapshot(resume_id)
 
 
 @receiver(pre_save, sender=Resume)
-def delete_old_files_on_change(sender, instance, **kwargs):
-    """Delete old files when new files are uploaded"""
-    if not instance.pk:
-        return False  # New instance, nothing to delete
-
-    try:
-        old_resume = Resume.objects.get(pk=instance.pk)
-    except Resume.DoesNotExist:
-        return False
-
-    # Delete old image if a new one is uploaded
-    if old_resume.image and old_resume.image != instance.image:
-        if os.path.isfile(old_resume.image.path):
-            os.remove(old_resume.image.path)
-    
-    # Delete old PDF if a new one is uploaded
-    if old_resume.pdf_resume and old_resume.pdf_resume != instance.pdf_resume:
-        if os.path.isfile(old_resume.pdf_resume.path):
-            os.remove(old_resume.pdf_resume.path)
+def resume_image_uploaded(sender, instance, raw=False, **kwargs):
+    """Downscale, strip and recompress a new upload before it is stored"""
+    if not raw:
+        ingest_image(instance.image)
+
+
+@receiver(post_save, sender=Resume)
+def resume_image_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_variants(instance, 'image')
+
 
+@receiver(variants_stored, sender=Resume)
+def resume_image_variants_stored(sender, pk, **kwargs):
+    invalidate_resume_snapshot(pk)
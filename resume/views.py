@@ -1,22 +1,20 @@
 from django.shortcuts import render, get_object_or_404
-from django.http import HttpResponse, Http404
+from django.http import Http404
 from django.conf import settings
 import os
-from .models import Resume
+from .models import Resume, get_resume_snapshot
+from lib.file_delivery import serve_file
+from lib.page_cache import add_page_tags
 
 # Create your views here.
 
 def resume_view(request):
-    # Get the first resume (or you can filter by specific criteria)
-    try:
-        resume = Resume.objects.first()  # Gets the first resume
-        # Or use: resume = Resume.objects.get(id=1)  # Gets specific resume by ID
-    except Resume.DoesNotExist:
-        resume = None
-    
+    # Whole resume graph in one query per section (ordered prefetches), cached as a snapshot.
+    # The rendered body is cached as a template fragment on top of that.
     context = {
-        'resume': resume,
+        'resume': get_resume_snapshot(),
     }
+    add_page_tags(request, 'resume')
     return render(request, 'resume/resume.html', context=context)
 
 def download_resume_pdf(request, resume_id):
@@ -31,9 +29,12 @@ def download_resume_pdf(request, resume_id):
     if not os.path.exists(file_path):
         raise Http404("PDF file not found")
     
-    with open(file_path, 'rb') as pdf_file:
-        response = HttpResponse(pdf_file.read(), content_type='application/pdf')
-        file_name = resume.full_name
-        file_name = file_name.replace(' ','-')
-        response['Content-Disposition'] = f'attachment; filename="{resume.full_name}_Resume.pdf"'
-        return response
\ No newline at end of file
+    file_name = resume.full_name.replace(' ', '-')
+    # Streamed with Range/ETag support instead of reading the whole PDF into memory
+    return serve_file(
+        request,
+        file_path,
+        content_type='application/pdf',
+        as_attachment=True,
+        filename=f'{file_name}_Resume.pdf',
+    )
\ No newline at end of file
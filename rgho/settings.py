@@ -50,6 +50,7 @@ INSTALLED_APPS = [
     'projects',
     'resume',
     'blog',
+    'search',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -67,6 +68,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Last, so it sees the user, messages and CSRF token the middleware above set up
+    'lib.page_cache.PageCacheMiddleware',
 ]
 
 ROOT_URLCONF = 'rgho.urls'
@@ -84,6 +87,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'resume.context_processors.resume',
             ],
         },
     },
@@ -101,6 +105,23 @@ DATABASES = {
     )
 }
 
+# Cache
+# File based so every gunicorn worker shares entries and sees invalidations
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('CACHE_LOCATION', str(BASE_DIR / '.cache')),
+        'TIMEOUT': None,
+    },
+    # Rendered pages get their own directory, so they never crowd out the keys above when culled
+    'pages': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('PAGE_CACHE_LOCATION', str(BASE_DIR / '.cache' / 'pages')),
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -143,6 +164,12 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 # Media files (User uploads)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Uploads are stored once per distinct content and reference counted, see lib/content_storage.py
+STORAGES = {
+    'default': {'BACKEND': 'lib.content_storage.ContentAddressedStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+MEDIA_SWEEP_GRACE_HOURS = 24  # how long an unreferenced file is kept before `manage.py sweep_media` removes it
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -158,6 +185,85 @@ EMAIL_HOST_USER = os.getenv('EMAIL_ADDRESS')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_PASSWORD')
 EMAIL_USE_TLS = True
 EMAIL_USE_SSL = False
+EMAIL_TIMEOUT = int(os.getenv('EMAIL_TIMEOUT', '20'))  # seconds per SMTP operation, well below OUTBOX_LEASE_SECONDS
 DEFAULT_FROM_EMAIL = f"rgho <{os.getenv('EMAIL_ADDRESS')}>"
 
 
+# MARKDOWN RENDERING
+# Changing this list invalidates every stored render; run `manage.py render_markdown`
+MARKDOWN_EXTENSIONS = [
+    'extra',
+    'tables',
+]
+
+
+
+
+# BLOG VIEW COUNTER
+# Views are buffered per process and written in batches once either threshold is hit
+VIEW_COUNTER_FLUSH_INTERVAL = int(os.getenv('VIEW_COUNTER_FLUSH_INTERVAL', '30'))  # seconds
+VIEW_COUNTER_FLUSH_SIZE = int(os.getenv('VIEW_COUNTER_FLUSH_SIZE', '100'))  # buffered views
+
+
+# RELATED POSTS (precomputed by lib/related_posts.py)
+RELATED_POSTS_COUNT = 3
+
+# BLOG COMMENTS
+COMMENT_THREADS_PER_PAGE = 20  # top-level threads per page, each loaded with all its replies
+
+# READER DASHBOARD (bookmarks and likes)
+DASHBOARD_POSTS_PER_PAGE = 12
+# Readers sign in through the admin login form
+LOGIN_URL = 'admin:login'
+
+
+# GITHUB ACTIVITY FEED
+GITHUB_API_URL = os.getenv('GITHUB_API_URL', 'https://api.github.com')
+GITHUB_USERNAME = os.getenv('GITHUB_USERNAME', 'rougho')
+GITHUB_TOKEN = os.getenv('GITHUB_TOKEN')
+GITHUB_ACTIVITY_TTL = int(os.getenv('GITHUB_ACTIVITY_TTL', '900'))  # seconds before a snapshot is refreshed
+GITHUB_REFRESH_LOCK_TIMEOUT = 300  # seconds before a stuck or failed refresh may be retried
+GITHUB_REQUEST_TIMEOUT = 5  # seconds per GitHub API call
+
+# EMAIL OUTBOX (delivered by `manage.py send_outbox`)
+OUTBOX_MAX_ATTEMPTS = 6
+OUTBOX_RETRY_BASE_DELAY = 60  # seconds, doubled after every failed attempt
+OUTBOX_LEASE_SECONDS = 300  # how long a claimed batch is hidden from other workers
+
+# NEWSLETTER BROADCASTS
+SITE_URL = os.getenv('SITE_URL', 'https://rgho.de')  # used for absolute links in emails sent outside a request
+NEWSLETTER_SEND_RATE = float(os.getenv('NEWSLETTER_SEND_RATE', '10'))  # emails per second, 0 disables throttling
+NEWSLETTER_CHUNK_SIZE = 500
+NEWSLETTER_LEASE_TIMEOUT = int(os.getenv('NEWSLETTER_LEASE_TIMEOUT', '300'))  # seconds without a checkpoint before --resume takes over a broadcast
+
+# PAGE CACHE (anonymous full pages, see lib/page_cache.py)
+PAGE_CACHE_ENABLED = str(os.getenv('PAGE_CACHE_ENABLED', '1')) == '1'
+PAGE_CACHE_ALIAS = 'pages'
+PAGE_CACHE_TIMEOUT = int(os.getenv('PAGE_CACHE_TIMEOUT', '600'))  # upper bound for pages whose data changes without signals
+
+# IMAGE INGEST (uploads are normalized before they are stored, see lib/image_ingest.py)
+IMAGE_INGEST_MAX_PIXELS = 50_000_000  # larger uploads are rejected from their header (decompression bombs)
+IMAGE_INGEST_MAX_EDGE = 2560  # longest side kept after downscaling
+IMAGE_INGEST_QUALITY = 85  # JPEG/WebP re-encode quality
+
+# IMAGE VARIANTS (resized copies of uploaded images, see lib/image_variants.py)
+IMAGE_VARIANT_WIDTHS = (480, 960, 1600)
+IMAGE_VARIANT_FORMATS = ('webp', 'jpeg')  # first one is preferred, last one is the <img> fallback
+IMAGE_VARIANT_QUALITY = 80
+IMAGE_VARIANT_WORKERS = int(os.getenv('IMAGE_VARIANT_WORKERS', '2'))  # process pool size, 0 builds inline after commit
+
+# FILE DELIVERY (media uploads and the resume PDF, see lib/file_delivery.py)
+# 'x-accel-redirect' (nginx) or 'x-sendfile' (Apache/lighttpd) hands the body to the front proxy
+FILE_DELIVERY_OFFLOAD = os.getenv('FILE_DELIVERY_OFFLOAD') or None
+FILE_DELIVERY_ACCEL_PREFIX = os.getenv('FILE_DELIVERY_ACCEL_PREFIX', '/protected-media/')  # internal nginx location aliased to MEDIA_ROOT
+FILE_DELIVERY_CHUNK_SIZE = 64 * 1024
+MEDIA_CACHE_MAX_AGE = 60 * 60 * 24 * 7
+MEDIA_IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365  # content-addressed uploads and image variants
+
+# SITE SEARCH (see search/backends.py)
+# 'postgres' (tsvector + GIN) or 'memory' (in-process inverted index); picked from the database when unset
+SEARCH_BACKEND = os.getenv('SEARCH_BACKEND') or None
+SEARCH_CONFIG = 'english'  # PostgreSQL text search configuration
+SEARCH_TIME_BUDGET_MS = int(os.getenv('SEARCH_TIME_BUDGET_MS', '250'))
+SEARCH_RESULTS_LIMIT = 20
+TYPEAHEAD_SYNC_INTERVAL = 5  # seconds between checks for suggestions changed by other processes
@@ -1,4 +1,28 @@
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import Http404
 from django.shortcuts import render
+from django.utils.cache import patch_cache_control
+from django.utils._os import safe_join
+
+from lib.content_storage import CONTENT_PREFIX
+from lib.file_delivery import serve_file
+from lib.image_variants import VARIANTS_DIR
+
 
 def handle_404(request, exception):
-    return render(request, 'errors/404.html', status=404)
\ No newline at end of file
+    return render(request, 'errors/404.html', status=404)
+
+
+def serve_media(request, path):
+    """Serve uploads from MEDIA_ROOT (streamed, range and conditional aware) in every environment"""
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("File not found")
+    if path.startswith((f'{CONTENT_PREFIX}/', f'{VARIANTS_DIR}/')):
+        # Named after their content, so a URL never changes meaning
+        response = serve_file(request, full_path, max_age=settings.MEDIA_IMMUTABLE_MAX_AGE)
+        patch_cache_control(response, immutable=True)
+        return response
+    return serve_file(request, full_path, max_age=settings.MEDIA_CACHE_MAX_AGE)
@@ -0,0 +1,51 @@
+from django.contrib import admin
+
+from .engine import search_object_ids
+from .indexing import index_object, remove_object
+from .models import SearchDocument
+from .sources import SEARCH_SOURCES
+
+
+class SearchIndexAdminMixin:
+    """
+    Adds full-text matches from the search index to the admin search box, so
+    search_fields can stay on short columns instead of LIKE scans over bodies.
+    """
+
+    def get_search_results(self, request, queryset, search_term):
+        original = queryset
+        queryset, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if search_term:
+            ids = search_object_ids(self.model, search_term)
+            if ids:
+                queryset = queryset | original.filter(pk__in=ids)
+        return queryset, may_have_duplicates
+
+
+@admin.register(SearchDocument)
+class SearchDocumentAdmin(admin.ModelAdmin):
+    list_display = ['title', 'kind', 'source', 'public', 'url', 'updated_at']
+    list_filter = ['source', 'public']
+    readonly_fields = ['source', 'object_id', 'kind', 'title', 'summary', 'body', 'url', 'public', 'updated_at']
+    search_fields = ['title', 'source']
+
+    def has_add_permission(self, request):
+        return False
+
+    actions = ['reindex']
+
+    def reindex(self, request, queryset):
+        reindexed = 0
+        for document in queryset:
+            source = SEARCH_SOURCES.get(document.source)
+            if source is None:
+                document.delete()
+                continue
+            instance = source.model.objects.filter(pk=document.object_id).first()
+            if instance is None:
+                remove_object(source.model, document.object_id)
+                continue
+            index_object(instance)
+            reindexed += 1
+        self.message_user(request, f'{reindexed} documents re-indexed.')
+    reindex.short_description = 'Re-index selected documents'
@@ -0,0 +1,220 @@
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.core.cache import cache
+from django.db import OperationalError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+import heapq
+import logging
+import math
+import re
+import threading
+import time
+
+from search.models import SearchDocument
+
+logger = logging.getLogger(__name__)
+
+SEARCH_INDEX_VERSION_KEY = 'search:index_version'
+
+WORD_RE = re.compile(r'\w+')
+STOPWORDS = frozenset(
+    'a an and are as at be but by for from has have in into is it its of on or '
+    'that the their this to was were will with'.split()
+)
+
+
+def normalize(word):
+    """Lowercase and strip simple plural endings, so 'categories' finds 'category'"""
+    word = word.lower()
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+
+def tokenize(text):
+    terms = (normalize(word) for word in WORD_RE.findall(text or ''))
+    return [term for term in terms if len(term) > 1 and term not in STOPWORDS]
+
+
+def bump_index_version():
+    """Tell every process that documents changed (after commit, so they can read them)"""
+    def bump():
+        try:
+            cache.incr(SEARCH_INDEX_VERSION_KEY)
+        except ValueError:
+            cache.set(SEARCH_INDEX_VERSION_KEY, 1, None)
+    transaction.on_commit(bump)
+
+
+class PostgresSearchBackend:
+    """tsvector column with a GIN index, ranked with ts_rank"""
+    name = 'postgres'
+
+    def vector(self):
+        config = settings.SEARCH_CONFIG
+        return (
+            SearchVector('title', weight='A', config=config)
+            + SearchVector('summary', weight='B', config=config)
+            + SearchVector('body', weight='C', config=config)
+        )
+
+    def document_saved(self, document):
+        SearchDocument.objects.filter(pk=document.pk).update(search_vector=self.vector())
+
+    def documents_removed(self):
+        pass
+
+    def rebuild(self):
+        SearchDocument.objects.update(search_vector=self.vector())
+
+    def search(self, query, terms, limit, budget_ms, public_only=True, source=None):
+        search_query = SearchQuery(query, search_type='websearch', config=settings.SEARCH_CONFIG)
+        documents = SearchDocument.objects.filter(search_vector=search_query)
+        if public_only:
+            documents = documents.filter(public=True)
+        if source:
+            documents = documents.filter(source=source)
+        documents = (
+            documents
+            .annotate(rank=SearchRank(F('search_vector'), search_query))
+            .order_by('-rank', '-updated_at')
+            .values_list('pk', 'rank')[:limit]
+        )
+        try:
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    # Scoped to this transaction, so a slow query is cancelled instead of piling up
+                    cursor.execute("SELECT set_config('statement_timeout', %s, true)", [str(int(budget_ms))])
+                return list(documents), False
+        except OperationalError as e:
+            logger.warning(f"Search for {query!r} exceeded {budget_ms}ms: {str(e)}")
+            return [], True
+
+
+class InvertedIndexBackend:
+    """
+    In-process inverted index for databases without full-text search (SQLite).
+    Each process keeps its own copy and catches up on documents changed by
+    other processes when the shared index version moves. Ranked with BM25.
+    """
+    name = 'memory'
+
+    FIELD_WEIGHTS = (('title', 3), ('summary', 2), ('body', 1))
+    K1 = 1.2
+    B = 0.75
+    # Re-read documents saved shortly before the last sync, in case their transaction committed late
+    SYNC_OVERLAP = timedelta(seconds=60)
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.postings = defaultdict(dict)  # term -> {document pk: weighted term frequency}
+        self.documents = {}  # document pk -> (length, public, source, terms)
+        self.total_length = 0
+        self.version = None
+        self.synced_at = None
+
+    def document_saved(self, document):
+        bump_index_version()
+
+    def documents_removed(self):
+        bump_index_version()
+
+    def rebuild(self):
+        bump_index_version()
+
+    def _add(self, document):
+        frequencies = defaultdict(int)
+        for field, weight in self.FIELD_WEIGHTS:
+            for term in tokenize(getattr(document, field)):
+                frequencies[term] += weight
+        length = sum(frequencies.values())
+        for term, frequency in frequencies.items():
+            self.postings[term][document.pk] = frequency
+        self.documents[document.pk] = (length, document.public, document.source, tuple(frequencies))
+        self.total_length += length
+
+    def _remove(self, pk):
+        entry = self.documents.pop(pk, None)
+        if entry is None:
+            return
+        length, _, _, terms = entry
+        for term in terms:
+            term_postings = self.postings[term]
+            term_postings.pop(pk, None)
+            if not term_postings:
+                del self.postings[term]
+        self.total_length -= length
+
+    def sync(self):
+        version = cache.get(SEARCH_INDEX_VERSION_KEY)
+        if self.synced_at is not None and version == self.version:
+            return
+        with self.lock:
+            if self.synced_at is not None and version == self.version:
+                return
+            started = timezone.now()
+            documents = SearchDocument.objects.only('pk', 'source', 'title', 'summary', 'body', 'public')
+            if self.synced_at is not None:
+                live = set(SearchDocument.objects.values_list('pk', flat=True))
+                for pk in [pk for pk in self.documents if pk not in live]:
+                    self._remove(pk)
+                documents = documents.filter(updated_at__gte=self.synced_at - self.SYNC_OVERLAP)
+            for document in documents.iterator(chunk_size=500):
+                self._remove(document.pk)
+                self._add(document)
+            self.version = version
+            self.synced_at = started
+
+    def search(self, query, terms, limit, budget_ms, public_only=True, source=None):
+        deadline = time.monotonic() + budget_ms / 1000
+        self.sync()
+        timed_out = False
+        scores = []
+        with self.lock:
+            term_postings = [self.postings.get(term) for term in terms]
+            if not term_postings or not all(term_postings):
+                return [], False
+            # Every term has to match; start from the rarest one
+            term_postings.sort(key=len)
+            candidates = set(term_postings[0]).intersection(*term_postings[1:])
+            total = len(self.documents)
+            average_length = self.total_length / total
+            idf = [math.log(1 + (total - len(p) + 0.5) / (len(p) + 0.5)) for p in term_postings]
+
+            for index, pk in enumerate(candidates):
+                if index % 256 == 0 and time.monotonic() > deadline:
+                    timed_out = True
+                    break
+                length, public, document_source, _ = self.documents[pk]
+                if (public_only and not public) or (source and document_source != source):
+                    continue
+                norm = self.K1 * (1 - self.B + self.B * length / average_length)
+                score = 0
+                for weight, postings in zip(idf, term_postings):
+                    frequency = postings[pk]
+                    score += weight * frequency * (self.K1 + 1) / (frequency + norm)
+                scores.append((score, pk))
+
+        if timed_out:
+            logger.warning(f"Search for {query!r} exceeded {budget_ms}ms, returning partial results")
+        return [(pk, score) for score, pk in heapq.nlargest(limit, scores)], timed_out
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """PostgreSQL full-text search when the database supports it, the in-process index otherwise"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                name = settings.SEARCH_BACKEND or ('postgres' if connection.vendor == 'postgresql' else 'memory')
+                _backend = PostgresSearchBackend() if name == 'postgres' else InvertedIndexBackend()
+    return _backend
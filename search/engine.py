@@ -0,0 +1,95 @@
+from django.conf import settings
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+import time
+
+from search.backends import WORD_RE, get_backend, normalize, tokenize
+from search.models import SearchDocument
+
+
+def highlight(text, terms):
+    """Escape `text` and wrap words matching the query terms in <mark>"""
+    parts = []
+    last = 0
+    for match in WORD_RE.finditer(text):
+        if normalize(match.group()) in terms:
+            parts.append(escape(text[last:match.start()]))
+            parts.append(f'<mark>{escape(match.group())}</mark>')
+            last = match.end()
+    parts.append(escape(text[last:]))
+    return mark_safe(''.join(parts))
+
+
+def make_snippet(text, terms, size=30):
+    """A window of about `size` words around the first match, highlighted"""
+    words = list(WORD_RE.finditer(text))
+    if not words:
+        return ''
+    first = next((i for i, word in enumerate(words) if normalize(word.group()) in terms), 0)
+    start = max(first - size // 3, 0)
+    end = min(start + size, len(words)) - 1
+    fragment = highlight(text[words[start].start():words[end].end()], terms)
+    prefix = '… ' if start > 0 else ''
+    suffix = ' …' if end < len(words) - 1 else ''
+    return mark_safe(f'{prefix}{fragment}{suffix}')
+
+
+class SearchHit:
+    def __init__(self, document, rank, terms):
+        self.document = document
+        self.rank = rank
+        self.title_html = highlight(document.title, terms)
+        # Prefer the passage that actually matched
+        text = document.body
+        if not any(term in terms for term in tokenize(document.body)) and document.summary:
+            text = document.summary
+        self.snippet_html = make_snippet(text, terms)
+
+
+class SearchResults:
+    def __init__(self, query, hits=(), took_ms=0, timed_out=False, backend=''):
+        self.query = query
+        self.hits = list(hits)
+        self.took_ms = took_ms
+        self.timed_out = timed_out
+        self.backend = backend
+
+    def __iter__(self):
+        return iter(self.hits)
+
+    def __len__(self):
+        return len(self.hits)
+
+
+def search(query, limit=None, public_only=True, source=None, budget_ms=None):
+    """
+    Ranked, highlighted results for `query` across every indexed model.
+    Stops after SEARCH_TIME_BUDGET_MS and flags the results as timed out.
+    """
+    started = time.monotonic()
+    limit = limit or settings.SEARCH_RESULTS_LIMIT
+    budget_ms = budget_ms or settings.SEARCH_TIME_BUDGET_MS
+    backend = get_backend()
+    terms = set(tokenize(query))
+    if not terms:
+        return SearchResults(query, backend=backend.name)
+
+    ranked, timed_out = backend.search(query, terms, limit, budget_ms, public_only=public_only, source=source)
+    documents = SearchDocument.objects.defer('search_vector').in_bulk([pk for pk, _ in ranked])
+    hits = [SearchHit(documents[pk], rank, terms) for pk, rank in ranked if pk in documents]
+    took_ms = round((time.monotonic() - started) * 1000, 1)
+    return SearchResults(query, hits, took_ms=took_ms, timed_out=timed_out, backend=backend.name)
+
+
+def search_object_ids(model, query, limit=500):
+    """Primary keys of `model` instances matching `query`, drafts included (for the admin)"""
+    terms = set(tokenize(query))
+    if not terms:
+        return []
+    ranked, _ = get_backend().search(
+        query, terms, limit, settings.SEARCH_TIME_BUDGET_MS,
+        public_only=False, source=model._meta.label_lower,
+    )
+    return list(
+        SearchDocument.objects.filter(pk__in=[pk for pk, _ in ranked]).values_list('object_id', flat=True)
+    )
@@ -0,0 +1,50 @@
+from django.db import transaction
+import logging
+
+from search.backends import get_backend
+from search.models import SearchDocument
+from search.sources import SEARCH_SOURCES, get_source
+
+logger = logging.getLogger(__name__)
+
+
+def index_object(instance):
+    """Create, update or drop the SearchDocument for one instance of an indexed model"""
+    source = get_source(type(instance))
+    if source is None:
+        return None
+    fields = source.document(instance)
+    if fields is None:
+        remove_object(type(instance), instance.pk)
+        return None
+    document, _ = SearchDocument.objects.update_or_create(
+        source=source.label, object_id=instance.pk, defaults=fields,
+    )
+    get_backend().document_saved(document)
+    return document
+
+
+def remove_object(model, pk):
+    deleted, _ = SearchDocument.objects.filter(source=model._meta.label_lower, object_id=pk).delete()
+    if deleted:
+        get_backend().documents_removed()
+
+
+def rebuild_index(batch_size=200):
+    """Re-extract every indexed model from scratch and drop documents whose object is gone"""
+    indexed = 0
+    with transaction.atomic():
+        for label, source in SEARCH_SOURCES.items():
+            seen = []
+            for instance in source.queryset().iterator(chunk_size=batch_size):
+                fields = source.document(instance)
+                if fields is None:
+                    continue
+                SearchDocument.objects.update_or_create(source=label, object_id=instance.pk, defaults=fields)
+                seen.append(instance.pk)
+            SearchDocument.objects.filter(source=label).exclude(object_id__in=seen).delete()
+            indexed += len(seen)
+        SearchDocument.objects.exclude(source__in=list(SEARCH_SOURCES)).delete()
+        get_backend().rebuild()
+    logger.info(f"Search index rebuilt: {indexed} documents")
+    return indexed
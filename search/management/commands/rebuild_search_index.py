@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from search.indexing import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the site search index from posts, projects and resume entries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        indexed = rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{indexed} documents indexed'))
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+import random
+import time
+import tracemalloc
+
+from search.typeahead import TypeaheadIndex
+
+
+class Command(BaseCommand):
+    help = 'Build the typeahead index and report its size, memory use, rebuild time and lookup latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lookups', type=int, default=10000, help='Random prefix lookups to time')
+
+    def handle(self, *args, **options):
+        index = TypeaheadIndex()
+        tracemalloc.start()
+        elapsed = index.rebuild()
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        self.stdout.write(f'Rebuild time: {elapsed * 1000:.1f} ms')
+        self.stdout.write(f'Memory: {memory / 1024:.1f} KiB')
+        for scope, trie in index.tries.items():
+            self.stdout.write(f'{scope}: {len(trie)} suggestions, {trie.node_count()} trie nodes')
+
+        prefixes = [
+            (scope, suggestion.text[:random.randint(1, 4)])
+            for scope, trie in index.tries.items()
+            for suggestion in trie.suggestions.values()
+        ]
+        if not prefixes:
+            return
+        timings = []
+        for _ in range(options['lookups']):
+            scope, prefix = random.choice(prefixes)
+            started = time.perf_counter()
+            index.tries[scope].lookup(prefix, 8)
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        average = sum(timings) / len(timings)
+        p99 = timings[int(len(timings) * 0.99) - 1]
+        self.stdout.write(self.style.SUCCESS(
+            f'Lookup: {average * 1e6:.1f} µs average, {p99 * 1e6:.1f} µs p99 over {len(timings)} lookups'
+        ))
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.4 on 2026-10-18 15:56
+
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+def create_gin_index(apps, schema_editor):
+    """The tsvector column is only used (and worth indexing) on PostgreSQL"""
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX search_document_vector_gin ON search_searchdocument USING gin (search_vector)'
+        )
+
+
+def drop_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS search_document_vector_gin')
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(help_text='Model label, e.g. blog.post', max_length=50)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('kind', models.CharField(help_text='Shown next to the result, e.g. Blog post', max_length=30)),
+                ('title', models.CharField(max_length=300)),
+                ('summary', models.TextField(blank=True)),
+                ('body', models.TextField(blank=True)),
+                ('url', models.CharField(max_length=300)),
+                ('public', models.BooleanField(default=True, help_text='Drafts are only searchable from the admin')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('search_vector', django.contrib.postgres.search.SearchVectorField(editable=False, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['updated_at'], name='search_sear_updated_bb8de9_idx')],
+                'constraints': [models.UniqueConstraint(fields=('source', 'object_id'), name='search_document_unique_object')],
+            },
+        ),
+        migrations.RunPython(create_gin_index, drop_gin_index),
+    ]
@@ -0,0 +1,35 @@
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models
+
+
+class SearchDocument(models.Model):
+    """
+    One searchable object (a post, a project, a resume entry), flattened into
+    weighted text fields. Kept up to date by the receivers in search/signals.py.
+    """
+    source = models.CharField(max_length=50, help_text="Model label, e.g. blog.post")
+    object_id = models.PositiveBigIntegerField()
+    kind = models.CharField(max_length=30, help_text="Shown next to the result, e.g. Blog post")
+
+    # Ranked by weight: title > summary > body
+    title = models.CharField(max_length=300)
+    summary = models.TextField(blank=True)
+    body = models.TextField(blank=True)
+
+    url = models.CharField(max_length=300)
+    public = models.BooleanField(default=True, help_text="Drafts are only searchable from the admin")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Only filled on PostgreSQL (GIN indexed), other databases use the in-process index
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'object_id'], name='search_document_unique_object'),
+        ]
+        indexes = [
+            models.Index(fields=['updated_at']),
+        ]
+
+    def __str__(self):
+        return f'{self.kind}: {self.title}'
@@ -0,0 +1,81 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from blog.models import Category, Post, Tag
+from projects.models import Project
+from search.indexing import index_object, remove_object
+from search.sources import SEARCH_SOURCES
+from search.typeahead import get_typeahead_index
+
+
+def update_search_document(sender, instance, raw=False, **kwargs):
+    """Re-index an object whenever it is saved"""
+    if raw:
+        return
+    index_object(instance)
+
+
+def delete_search_document(sender, instance, **kwargs):
+    remove_object(sender, instance.pk)
+
+
+for _source in SEARCH_SOURCES.values():
+    post_save.connect(update_search_document, sender=_source.model, dispatch_uid=f'search_save_{_source.label}')
+    post_delete.connect(delete_search_document, sender=_source.model, dispatch_uid=f'search_delete_{_source.label}')
+
+
+def _reindex_posts(post_ids):
+    for post in Post.objects.filter(pk__in=post_ids).prefetch_related('tags'):
+        index_object(post)
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def post_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Tag names are part of a post's document"""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            index_object(instance)
+        return
+    # instance is a Tag, pk_set holds Post ids (None on clear, so remember them first)
+    if action == 'pre_clear':
+        instance._search_post_ids = list(instance.posts.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        _reindex_posts(getattr(instance, '_search_post_ids', []))
+    elif action in ('post_add', 'post_remove'):
+        _reindex_posts(pk_set)
+
+
+@receiver(post_save, sender=Tag)
+def tag_renamed(sender, instance, created=False, raw=False, **kwargs):
+    if created or raw:
+        return
+    _reindex_posts(instance.posts.values_list('pk', flat=True))
+
+
+# Typeahead suggestions
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def update_post_suggestion(sender, instance, raw=False, **kwargs):
+    if not raw:
+        get_typeahead_index().post_changed(instance, deleted=kwargs['signal'] is post_delete)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def update_tag_suggestion(sender, instance, raw=False, **kwargs):
+    if not raw:
+        get_typeahead_index().tag_changed(instance, deleted=kwargs['signal'] is post_delete)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def update_category_suggestion(sender, instance, raw=False, **kwargs):
+    if not raw:
+        get_typeahead_index().category_changed(instance, deleted=kwargs['signal'] is post_delete)
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+def update_technology_suggestions(sender, instance, raw=False, **kwargs):
+    if not raw:
+        get_typeahead_index().project_changed(instance, deleted=kwargs['signal'] is post_delete)
@@ -0,0 +1,119 @@
+from django.urls import reverse
+from django.utils.html import strip_tags
+
+from blog.models import Post
+from projects.models import Project
+from resume import models as resume_models
+
+
+class SearchSource:
+    """How instances of one model are turned into SearchDocument fields"""
+
+    def __init__(self, model, kind, build, queryset=None):
+        self.model = model
+        self.kind = kind
+        self.build = build
+        self._queryset = queryset
+
+    @property
+    def label(self):
+        return self.model._meta.label_lower
+
+    def queryset(self):
+        return self._queryset() if self._queryset else self.model.objects.all()
+
+    def document(self, instance):
+        """Fields for SearchDocument, or None if the instance should not be indexed"""
+        fields = self.build(instance)
+        if fields is None:
+            return None
+        fields.setdefault('public', True)
+        fields['kind'] = self.kind
+        fields['title'] = fields['title'][:300]
+        return fields
+
+
+def _plain_text(html):
+    """Rendered markdown without the tags, so syntax characters do not pollute the index"""
+    return ' '.join(strip_tags(html).split())
+
+
+def _post_document(post):
+    return {
+        'title': post.title,
+        'summary': ' '.join([post.excerpt, *(tag.name for tag in post.tags.all())]),
+        'body': _plain_text(post.get_content_html()),
+        'url': reverse('blog_post', args=[post.slug]),
+        'public': post.status == 'published',
+    }
+
+
+def _project_document(project):
+    return {
+        'title': project.title,
+        'summary': project.technologies,
+        'body': _plain_text(project.get_description_html()),
+        'url': reverse('single_project', args=[project.slug]),
+    }
+
+
+def _experience_document(experience):
+    return {
+        'title': f'{experience.job_title} at {experience.company}',
+        'summary': experience.location,
+        'body': experience.job_description,
+        'url': reverse('resume'),
+    }
+
+
+def _resume_project_document(project):
+    return {
+        'title': project.title,
+        'summary': project.technologies,
+        'body': project.description,
+        'url': reverse('resume'),
+    }
+
+
+def _education_document(education):
+    return {
+        'title': f'{education.degree}, {education.institution}',
+        'summary': education.location,
+        'body': education.description,
+        'url': reverse('resume'),
+    }
+
+
+def _skill_document(skill):
+    return {
+        'title': skill.name,
+        'summary': f'{skill.category} {skill.get_level_display()}',
+        'body': '',
+        'url': reverse('resume'),
+    }
+
+
+def _other_document(other):
+    return {
+        'title': other.title,
+        'summary': '',
+        'body': other.description,
+        'url': reverse('resume'),
+    }
+
+
+SEARCH_SOURCES = {
+    source.label: source for source in [
+        SearchSource(Post, 'Blog post', _post_document, queryset=lambda: Post.objects.prefetch_related('tags')),
+        SearchSource(Project, 'Project', _project_document),
+        SearchSource(resume_models.Experience, 'Experience', _experience_document),
+        SearchSource(resume_models.Project, 'Resume project', _resume_project_document),
+        SearchSource(resume_models.Education, 'Education', _education_document),
+        SearchSource(resume_models.Skill, 'Skill', _skill_document),
+        SearchSource(resume_models.Other, 'Resume', _other_document),
+    ]
+}
+
+
+def get_source(model):
+    return SEARCH_SOURCES.get(model._meta.label_lower)
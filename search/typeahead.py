@@ -0,0 +1,313 @@
+from collections import namedtuple
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.urls import reverse
+from django.utils.http import urlencode
+import logging
+import re
+import threading
+import time
+
+from blog.models import Category, Post, Tag
+from projects.models import Project
+
+logger = logging.getLogger(__name__)
+
+TYPEAHEAD_VERSION_KEY = 'search:typeahead_version'
+
+Suggestion = namedtuple('Suggestion', 'key text kind url weight')
+
+SPACE_RE = re.compile(r'\s+')
+
+
+def normalize(text):
+    return SPACE_RE.sub(' ', text).strip().lower()
+
+
+def _rank(suggestion):
+    return (-suggestion.weight, suggestion.text.lower())
+
+
+class TrieNode:
+    __slots__ = ('children', 'entries', 'top')
+
+    def __init__(self):
+        self.children = {}
+        self.entries = None  # keys of suggestions whose index key ends here
+        self.top = ()  # best suggestions in this subtree, so lookups never walk it
+
+
+class PrefixTrie:
+    """
+    Character trie where every node caches its TOP_K best suggestions. A lookup
+    is one walk down the prefix; inserts and removals only touch the nodes on
+    the paths of the changed suggestion.
+    """
+    TOP_K = 10
+    # Index keys are cut here; longer prefixes are checked against the text
+    MAX_DEPTH = 24
+
+    def __init__(self):
+        self.root = TrieNode()
+        self.suggestions = {}  # suggestion key -> Suggestion
+        self.paths = {}  # suggestion key -> index keys
+
+    def __len__(self):
+        return len(self.suggestions)
+
+    def index_keys(self, text):
+        """The text from every word start, so 'django tips' is found by 'tip' too"""
+        text = normalize(text)
+        starts = [0] + [match.end() for match in re.finditer(' ', text)]
+        return {text[start:start + self.MAX_DEPTH] for start in starts if start < len(text)}
+
+    def add(self, suggestion):
+        self.remove(suggestion.key)
+        self.suggestions[suggestion.key] = suggestion
+        keys = self.index_keys(suggestion.text)
+        self.paths[suggestion.key] = keys
+        for key in keys:
+            node = self.root
+            for char in key:
+                node = node.children.setdefault(char, TrieNode())
+                node.top = self._best(node.top + (suggestion,))
+            if node.entries is None:
+                node.entries = set()
+            node.entries.add(suggestion.key)
+
+    def _walk(self, key):
+        """Nodes from the root along `key`, as far as they exist"""
+        path = [self.root]
+        for char in key:
+            node = path[-1].children.get(char)
+            if node is None:
+                break
+            path.append(node)
+        return path
+
+    def remove(self, key):
+        suggestion = self.suggestions.pop(key, None)
+        if suggestion is None:
+            return
+        index_keys = self.paths.pop(key)
+        for index_key in index_keys:
+            path = self._walk(index_key)
+            if len(path) == len(index_key) + 1 and path[-1].entries:
+                path[-1].entries.discard(key)
+                if not path[-1].entries:
+                    path[-1].entries = None
+        # Recompute the cached tops bottom-up and prune emptied branches
+        for index_key in index_keys:
+            path = self._walk(index_key)
+            for depth in range(len(path) - 1, 0, -1):
+                node = path[depth]
+                if not node.children and node.entries is None:
+                    del path[depth - 1].children[index_key[depth - 1]]
+                    continue
+                if any(item.key == key for item in node.top):
+                    candidates = [self.suggestions[k] for k in node.entries or ()]
+                    for child in node.children.values():
+                        candidates.extend(item for item in child.top if item.key != key)
+                    node.top = self._best(candidates)
+
+    def _best(self, candidates):
+        unique = {suggestion.key: suggestion for suggestion in candidates}
+        return tuple(sorted(unique.values(), key=_rank)[:self.TOP_K])
+
+    def lookup(self, prefix, limit):
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        node = self.root
+        for char in prefix[:self.MAX_DEPTH]:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        if len(prefix) <= self.MAX_DEPTH:
+            return list(node.top[:limit])
+        return [s for s in node.top if (' ' + normalize(s.text)).find(' ' + prefix) != -1][:limit]
+
+    def node_count(self):
+        count = 0
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            count += 1
+            stack.extend(node.children.values())
+        return count
+
+
+class TypeaheadIndex:
+    """
+    Suggestions per search box scope: 'blog' (post titles, tags, categories)
+    and 'projects' (technologies). Lives in process memory; saves in this
+    process are applied incrementally, other processes rebuild when the shared
+    version moves (checked at most every TYPEAHEAD_SYNC_INTERVAL seconds).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tries = {}
+        self.project_technologies = {}  # project pk -> normalized technology names
+        self.technology_projects = {}  # normalized technology name -> project pks
+        self.version = None
+        self.loaded = False
+        self.next_check = 0
+
+    # Suggestions
+
+    def _search_url(self, text):
+        return reverse('search') + '?' + urlencode({'q': text})
+
+    def _post_suggestion(self, post):
+        url = reverse('blog_post', args=[post.slug])
+        return Suggestion(('post', post.pk), post.title, 'Post', url, 1)
+
+    def _tag_suggestion(self, tag):
+        return Suggestion(('tag', tag.pk), tag.name, 'Tag', self._search_url(tag.name), tag.published_post_count)
+
+    def _category_suggestion(self, category):
+        return Suggestion(
+            ('category', category.pk), category.name, 'Category',
+            self._search_url(category.name), category.published_post_count,
+        )
+
+    def _technology_suggestion(self, name, display):
+        count = len(self.technology_projects[name])
+        return Suggestion(('technology', name), display, 'Technology', self._search_url(display), count)
+
+    @staticmethod
+    def split_technologies(technologies):
+        return {normalize(name): name.strip() for name in (technologies or '').split(',') if name.strip()}
+
+    # Loading
+
+    def rebuild(self):
+        """Load everything from the database. Returns the elapsed seconds."""
+        started = time.perf_counter()
+        version = cache.get(TYPEAHEAD_VERSION_KEY)
+        blog, projects = PrefixTrie(), PrefixTrie()
+        self.project_technologies, self.technology_projects = {}, {}
+
+        for post in Post.objects.filter(status='published').only('pk', 'title', 'slug'):
+            blog.add(self._post_suggestion(post))
+        for tag in Tag.objects.only('pk', 'name', 'published_post_count'):
+            blog.add(self._tag_suggestion(tag))
+        for category in Category.objects.only('pk', 'name', 'published_post_count'):
+            blog.add(self._category_suggestion(category))
+
+        displays = {}
+        for pk, technologies in Project.objects.values_list('pk', 'technologies'):
+            names = self.split_technologies(technologies)
+            self.project_technologies[pk] = set(names)
+            for name, display in names.items():
+                self.technology_projects.setdefault(name, set()).add(pk)
+                displays.setdefault(name, display)
+        for name, display in displays.items():
+            projects.add(self._technology_suggestion(name, display))
+
+        self.tries = {'blog': blog, 'projects': projects}
+        self.version = version
+        self.loaded = True
+        elapsed = time.perf_counter() - started
+        logger.info(f"Typeahead index rebuilt in {elapsed * 1000:.1f}ms ({len(blog) + len(projects)} suggestions)")
+        return elapsed
+
+    def _sync(self):
+        now = time.monotonic()
+        if self.loaded and now < self.next_check:
+            return
+        with self.lock:
+            if self.loaded and now < self.next_check:
+                return
+            self.next_check = now + settings.TYPEAHEAD_SYNC_INTERVAL
+            if not self.loaded or cache.get(TYPEAHEAD_VERSION_KEY) != self.version:
+                self.rebuild()
+
+    def suggest(self, prefix, scope='blog', limit=8):
+        self._sync()
+        trie = self.tries.get(scope)
+        return trie.lookup(prefix, limit) if trie else []
+
+    # Incremental updates, applied after the saving transaction commits
+
+    def _apply(self, update):
+        def apply():
+            if self.loaded:
+                with self.lock:
+                    update()
+            self._bump_version()
+        transaction.on_commit(apply)
+
+    def _bump_version(self):
+        try:
+            version = cache.incr(TYPEAHEAD_VERSION_KEY)
+        except ValueError:
+            version = 1
+            cache.set(TYPEAHEAD_VERSION_KEY, version, None)
+        # Our own change is already applied, so only a gap means another process changed something
+        if self.loaded and self.version is not None and version == self.version + 1:
+            self.version = version
+        elif self.loaded and self.version is None and version == 1:
+            self.version = version
+
+    def post_changed(self, post, deleted=False):
+        def update():
+            if deleted or post.status != 'published':
+                self.tries['blog'].remove(('post', post.pk))
+            else:
+                self.tries['blog'].add(self._post_suggestion(post))
+        self._apply(update)
+
+    def tag_changed(self, tag, deleted=False):
+        def update():
+            if deleted:
+                self.tries['blog'].remove(('tag', tag.pk))
+            else:
+                self.tries['blog'].add(self._tag_suggestion(tag))
+        self._apply(update)
+
+    def category_changed(self, category, deleted=False):
+        def update():
+            if deleted:
+                self.tries['blog'].remove(('category', category.pk))
+            else:
+                self.tries['blog'].add(self._category_suggestion(category))
+        self._apply(update)
+
+    def project_changed(self, project, deleted=False):
+        pk = project.pk
+        names = {} if deleted else self.split_technologies(project.technologies)
+
+        def update():
+            trie = self.tries['projects']
+            touched = self.project_technologies.pop(pk, set()) | set(names)
+            for name in touched:
+                self.technology_projects.get(name, set()).discard(pk)
+            if names:
+                self.project_technologies[pk] = set(names)
+            for name in names:
+                self.technology_projects.setdefault(name, set()).add(pk)
+            for name in touched:
+                if self.technology_projects.get(name):
+                    current = trie.suggestions.get(('technology', name))
+                    display = current.text if current else names[name]
+                    trie.add(self._technology_suggestion(name, display))
+                else:
+                    self.technology_projects.pop(name, None)
+                    trie.remove(('technology', name))
+        self._apply(update)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_typeahead_index():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = TypeaheadIndex()
+    return _index
@@ -0,0 +1,10 @@
+from django.urls import path
+from .views import (
+    search_view,
+    suggest_view,
+)
+
+urlpatterns = [
+    path('', search_view, name='search'),
+    path('suggest/', suggest_view, name='search_suggest'),
+]
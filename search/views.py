@@ -0,0 +1,26 @@
+from django.http import JsonResponse
+from django.shortcuts import render
+
+from search.engine import search
+from search.typeahead import get_typeahead_index
+
+
+def search_view(request):
+    query = request.GET.get('q', '').strip()[:200]
+    results = search(query) if query else None
+    return render(request, 'search/search.html', {'query': query, 'results': results})
+
+
+def suggest_view(request):
+    """Typeahead suggestions for the blog ('blog') and projects ('projects') search boxes"""
+    prefix = request.GET.get('q', '')[:100]
+    scope = request.GET.get('scope', 'blog')
+    suggestions = get_typeahead_index().suggest(prefix, scope=scope)
+    response = JsonResponse({
+        'suggestions': [
+            {'text': suggestion.text, 'kind': suggestion.kind, 'url': suggestion.url}
+            for suggestion in suggestions
+        ],
+    })
+    response['Cache-Control'] = 'public, max-age=60'
+    return response
@@ -31,3 +31,124 @@ document.addEventListener('DOMContentLoaded', function() {
     });
 });
 
+
+// Search box typeahead: inputs with data-typeahead-url get suggestions in a <datalist>
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('input[data-typeahead-url]').forEach(function(input) {
+        var list = document.createElement('datalist');
+        list.id = input.id ? input.id + '-suggestions' : 'typeahead-' + Math.random().toString(36).slice(2);
+        input.setAttribute('list', list.id);
+        input.setAttribute('autocomplete', 'off');
+        input.after(list);
+
+        var urls = {};
+        var timer = null;
+        var controller = null;
+
+        input.addEventListener('input', function() {
+            // Picking a suggestion goes straight to it
+            if (urls[input.value]) {
+                window.location.href = urls[input.value];
+                return;
+            }
+            clearTimeout(timer);
+            timer = setTimeout(function() {
+                var query = input.value.trim();
+                if (!query) {
+                    list.innerHTML = '';
+                    return;
+                }
+                if (controller) {
+                    controller.abort();
+                }
+                controller = new AbortController();
+                var url = new URL(input.dataset.typeaheadUrl, window.location.origin);
+                url.searchParams.set('q', query);
+                fetch(url, { signal: controller.signal })
+                    .then(function(response) { return response.json(); })
+                    .then(function(data) {
+                        list.innerHTML = '';
+                        urls = {};
+                        data.suggestions.forEach(function(suggestion) {
+                            var option = document.createElement('option');
+                            option.value = suggestion.text;
+                            option.label = suggestion.kind;
+                            urls[suggestion.text] = suggestion.url;
+                            list.appendChild(option);
+                        });
+                    })
+                    .catch(function() {});
+            }, 120);
+        });
+    });
+});
+
+
+// Likes and bookmarks: buttons with data-engagement-post / data-engagement-comment inside a
+// data-engagement-state-url container get their per-user state in one request, and set it on click
+document.addEventListener('DOMContentLoaded', function() {
+    function csrfToken() {
+        var match = document.cookie.match(/(?:^|;\s*)csrftoken=([^;]+)/);
+        return match ? decodeURIComponent(match[1]) : '';
+    }
+
+    function render(button, state) {
+        var key = button.dataset.engagementKey || 'liked';
+        button.setAttribute('aria-pressed', state[key] ? 'true' : 'false');
+        button.classList.toggle('active', !!state[key]);
+        var count = button.querySelector('[data-engagement-count]');
+        if (count && state.likes_count !== undefined) {
+            count.textContent = state.likes_count;
+        }
+    }
+
+    document.querySelectorAll('[data-engagement-state-url]').forEach(function(container) {
+        var buttons = container.querySelectorAll('[data-engagement-post], [data-engagement-comment]');
+        if (!buttons.length) {
+            return;
+        }
+        var ids = { posts: new Set(), comments: new Set() };
+        buttons.forEach(function(button) {
+            if (button.dataset.engagementPost) {
+                ids.posts.add(button.dataset.engagementPost);
+            } else {
+                ids.comments.add(button.dataset.engagementComment);
+            }
+        });
+
+        var url = new URL(container.dataset.engagementStateUrl, window.location.origin);
+        url.searchParams.set('posts', Array.from(ids.posts).join(','));
+        url.searchParams.set('comments', Array.from(ids.comments).join(','));
+        fetch(url, { credentials: 'same-origin' })
+            .then(function(response) { return response.json(); })
+            .then(function(data) {
+                buttons.forEach(function(button) {
+                    var state = button.dataset.engagementPost
+                        ? data.posts[button.dataset.engagementPost]
+                        : data.comments[button.dataset.engagementComment];
+                    if (state) {
+                        render(button, state);
+                    }
+                });
+            })
+            .catch(function() {});
+
+        buttons.forEach(function(button) {
+            button.addEventListener('click', function() {
+                var pressed = button.getAttribute('aria-pressed') === 'true';
+                fetch(pressed ? button.dataset.engagementOff : button.dataset.engagementOn, {
+                    method: 'POST',
+                    credentials: 'same-origin',
+                    headers: { 'X-CSRFToken': csrfToken() }
+                })
+                    .then(function(response) { return response.ok ? response.json() : null; })
+                    .then(function(state) {
+                        if (state) {
+                            render(button, state);
+                        }
+                    })
+                    .catch(function() {});
+            });
+        });
+    });
+});